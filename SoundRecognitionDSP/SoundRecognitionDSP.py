@@ -9,25 +9,28 @@ para compilar un ejecutable .exe:
 * luego ubique la consola en la carpeta de proyecto:
     cd ruta_de_carpeta_sin_incluir_el_.py
 * la carpeta contiene:
-    SoundRecognitionDSP.py (este codigo), icono.ico, img*.png (* de 0 a 17)
+    SoundRecognitionDSP.py (este codigo), nucleoDSP.py (algoritmos sin GUI),
+    icono.ico, img*.png (* de 0 a 17)
 * ejecutar comando generado con funcion: compilador(18), algo asi:
     pyinstaller -y -F -i "icono.ico" "SoundRecognitionDSP.py" ... etc
 """
 
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QWidget, QMessageBox,\
     QHBoxLayout, QVBoxLayout, QGroupBox, QPushButton, QLineEdit,\
-    QGridLayout, QLabel, QFileDialog, QSizePolicy
-from PyQt5.QtCore import Qt, QMargins, QThread, QPointF
-from PyQt5.QtGui import QIcon
+    QGridLayout, QLabel, QFileDialog, QSizePolicy, QComboBox, QCheckBox
+from PyQt5.QtCore import Qt, QMargins, QObject, QPointF, QEvent, pyqtSignal
+from PyQt5.QtGui import QIcon, QFontDatabase
 from PyQt5.QtChart import QChartView, QLineSeries
 import numpy as np
-from numpy.fft import fftn
-from scipy.fftpack import dct
-from python_speech_features import mfcc
 import sounddevice as sd
 import soundfile as sf
+from nucleoDSP import EntrenaDMNN, leeAudio, cambiaFrecuencia, leePatrones,\
+    escribePatrones, leeModelo, escribeRed, extraeRasgos, bloquePatrones, probarAudio,\
+    matrizConfusion, metricasConfusion, inicializaDMNN, nombreClase, EscuchaDMNN,\
+    FuenteAudio, extraeArchivo, probarArchivo, PiramideAudio, Medidor, Planificador, Trabajo
 
 # la funcion principal o inicializadora
 def main():
@@ -52,36 +55,34 @@ class GUI(QWidget):
         self.setWindowTitle("Sound Recognition DSP UV")
         self.setWindowIcon(QIcon("img0.png"))
 
-        # crear hilos
-        self.hiloTestOpt = HiloTestOpt()
-        self.hiloTestOpt.finished.connect(self.finHiloTestOpt)
-        self.hiloTestLow = HiloTestLow()
-        self.hiloTestLow.finished.connect(self.finHiloTestLow)
-        self.hiloRecord = HiloRecord()
-        self.hiloRecord.finished.connect(self.finHiloRecord)
-        self.hiloExtractOpt = HiloExtractOpt()
-        self.hiloExtractOpt.finished.connect(self.finHiloExtractOpt)
-        self.hiloExtractLow = HiloExtractLow()
-        self.hiloExtractLow.finished.connect(self.finHiloExtractLow)
-        self.hiloNewNet = HiloNewNet()
-        self.hiloNewNet.finished.connect(self.finHiloNewNet)
-        self.hiloTrainNet = HiloTrainNet()
-        self.hiloTrainNet.finished.connect(self.finHiloTrainNet)
-        self.hiloAccuracyNet = HiloAccuracyNet()
-        self.hiloAccuracyNet.finished.connect(self.finHiloAccuracyNet)
+        # planificador de trabajos en segundo plano, sus avisos llegan al hilo
+        # de la GUI por una señal, asi varios trabajos pueden correr a la vez
+        self.avisos = AvisosTrabajo()
+        self.avisos.evento.connect(self.avisoTrabajo)
+        self.planificador = Planificador(aviso=self.avisos.evento.emit)
 
         # variables del programa
-        self.ejecucion = False
         self.Fs = 16000
         self.voz = np.zeros(0, dtype=float)
+        # audio mas largo que largoMaximo segundos: no se carga, se guarda
+        # su ruta y se lee por bloques al extraer o probar
+        self.archivo = ""
+        self.largoMaximo = 600.0
+        # envolventes del audio para la grafica y rango visible en segundos
+        self.piramide = PiramideAudio.desdeVoz(self.voz, self.Fs)
+        self.vistaAudio = [0.0, 0.0]
         # 1 de pitch, 13 datos de MFCC y 1 es la clase
         self.patrones = np.zeros((0, 15), dtype=float)
+        # metodo "opt" o "low" y particion con que se extrajeron los patrones
+        self.metodo = None
+        self.particion = None
         # pesos sinapticos de red DMNN y numero de dendritas / neurona
         self.pesW = np.array([0.0])
         self.numK = np.array([0])
+        # curva de error del entrenamiento, sigue de un entrenamiento al otro
+        self.curvaError = np.zeros(0, dtype=float)
         # variables de la GUI
         self.turnoBajoCut = True
-        self.abortar = False
 
         # crear la GUI como tal
         self.crearGUI(True, 16)
@@ -214,6 +215,11 @@ class GUI(QWidget):
         aux.setToolTip(tooltips("record"))
         aux.clicked.connect(self.recordSignal)
         fondo3.addWidget(aux)
+        # boton de reconocimiento en vivo
+        aux = QPushButton(QIcon("img0.png"), "")
+        aux.setToolTip(tooltips("live"))
+        aux.clicked.connect(self.liveTest)
+        fondo3.addWidget(aux)
         # texto de segundos de grabacion
         self.textRecS = QLineEdit("3")
         self.textRecS.setAlignment(Qt.AlignRight)
@@ -232,6 +238,7 @@ class GUI(QWidget):
         self.plotAudio = QChartView()
         self.plotAudio.chart().setDropShadowEnabled(False)
         self.plotAudio.chart().setMargins(QMargins(0, 0, 0, 0))
+        self.plotAudio.viewport().installEventFilter(self)
 
         # juntar las cosas al final
         fondo1.addLayout(fondo2)
@@ -336,27 +343,52 @@ class GUI(QWidget):
         self.textIteracion.setMaxLength(6)
         self.textIteracion.setToolTip(tooltips("netItera"))
         fondo3.addWidget(self.textIteracion, 0, 3)
+        # selector de modo de entrenamiento
+        self.comboModo = QComboBox()
+        self.comboModo.addItems(["genetic", "delta", "population", "boxes"])
+        self.comboModo.setToolTip(tooltips("netModo"))
+        fondo3.addWidget(self.comboModo, 0, 4)
+        # paso fijo de mutacion como antes, sin adaptar
+        self.checkFijo = QCheckBox("Fixed step")
+        self.checkFijo.setToolTip(tooltips("netFijo"))
+        fondo3.addWidget(self.checkFijo, 1, 0)
+        # texto de iteraciones sin mejorar antes de parar
+        self.textPaciencia = QLineEdit("0")
+        self.textPaciencia.setAlignment(Qt.AlignRight)
+        self.textPaciencia.setMaxLength(7)
+        self.textPaciencia.setToolTip(tooltips("netPaciencia"))
+        fondo3.addWidget(self.textPaciencia, 1, 1)
+        # texto de por que termino el ultimo entreno
+        self.textParada = QLabel("Stop: -")
+        self.textParada.setToolTip(tooltips("infoParada"))
+        self.textParada.setAlignment(Qt.AlignLeft)
+        fondo3.addWidget(self.textParada, 1, 2, 1, 3)
         # abajo
         # texto de numero de pesos sinapticos
         self.textPesoW = QLabel("W: 0")
         self.textPesoW.setToolTip(tooltips("infoW"))
         self.textPesoW.setAlignment(Qt.AlignLeft)
-        fondo3.addWidget(self.textPesoW, 1, 0)
+        fondo3.addWidget(self.textPesoW, 2, 0)
         # texto de accuracy global
         self.textAccuracy = QLabel("Acc%: 0")
         self.textAccuracy.setToolTip(tooltips("infoAcc"))
         self.textAccuracy.setAlignment(Qt.AlignLeft)
-        fondo3.addWidget(self.textAccuracy, 1, 1)
+        fondo3.addWidget(self.textAccuracy, 2, 1)
         # texto de alguna otra cosa
         self.textEstado = QLabel("...")
         self.textEstado.setToolTip(tooltips("estado"))
         self.textEstado.setAlignment(Qt.AlignLeft)
-        fondo3.addWidget(self.textEstado, 1, 2)
+        fondo3.addWidget(self.textEstado, 2, 2)
         # texto de porcentaje entrenado
         self.textGo = QLabel("Go%: 0")
         self.textGo.setToolTip(tooltips("infoGo"))
         self.textGo.setAlignment(Qt.AlignLeft)
-        fondo3.addWidget(self.textGo, 1, 3)
+        fondo3.addWidget(self.textGo, 2, 3)
+        # texto de velocidad de entrenamiento
+        self.textVelocidad = QLabel("It/s: 0")
+        self.textVelocidad.setToolTip(tooltips("infoVel"))
+        self.textVelocidad.setAlignment(Qt.AlignLeft)
+        fondo3.addWidget(self.textVelocidad, 2, 4)
         # agregar a grupo superior
         pedazo = QVBoxLayout()
         pedazo.addSpacing(10)
@@ -475,6 +507,22 @@ class GUI(QWidget):
         # agregar a grupo superior
         fondo1.addLayout(matrix)
 
+        # panel con las medidas por etapa del ultimo proceso
+        medidas = QGroupBox("Stage Stats")
+        self.textMedidas = QLabel("")
+        self.textMedidas.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.textMedidas.setToolTip(tooltips("stats"))
+        self.textMedidas.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        # tracemalloc hace mas lento todo el proceso, por eso va apagado
+        self.checkMemoria = QCheckBox("Memory")
+        self.checkMemoria.setToolTip(tooltips("memoria"))
+        pedazo = QVBoxLayout()
+        pedazo.addSpacing(10)
+        pedazo.addWidget(self.checkMemoria)
+        pedazo.addWidget(self.textMedidas)
+        medidas.setLayout(pedazo)
+        fondo1.addWidget(medidas)
+
         # juntar las cosas al final
         pedazo = QVBoxLayout()
         pedazo.addSpacing(10)
@@ -485,6 +533,7 @@ class GUI(QWidget):
         fondo1.setStretch(0, 1)
         fondo1.setStretch(1, 1)
         fondo1.setStretch(2, 10)
+        fondo1.setStretch(3, 3)
 
         return grupo
 
@@ -507,29 +556,39 @@ class GUI(QWidget):
                                                  filter="Audio File (*.wav)")
         if fileDir:
             try:
-                self.voz, self.Fs = sf.read(fileDir)
-                try:
-                    self.voz = self.voz[:, 0]
-                except:
-                    pass
-                self.graphLine(self.plotAudio, self.voz, self.Fs)
-                titulo = os.path.basename(fileDir).replace(".wav", "")
-                self.textEtiqueta.setText("".join(k for k in titulo if k.isalpha()))
-                self.cambiarFrecuencia(16000)
+                fuente = FuenteAudio(fileDir)
+                self.textEtiqueta.setText(nombreClase(fileDir))
+                if fuente.duracion > self.largoMaximo:
+                    # solo las envolventes para la grafica
+                    self.Fs = 16000
+                    self.voz = np.zeros(0, dtype=float)
+                    self.archivo = fileDir
+                    self.nuevaGrafica(fuente)
+                else:
+                    self.archivo = ""
+                    self.voz, self.Fs = leeAudio(fileDir)
+                    self.cambiarFrecuencia(16000)
+                    self.nuevaGrafica()
             except:
                 self.Fs = 16000
                 self.voz = np.zeros(0, dtype=float)
+                self.archivo = ""
                 QMessageBox.about(self, "Error!", "cant open the file...")
 
     def cambiarFrecuencia(self, Fs):
-        if Fs != self.Fs:
-            oriY = self.voz.copy()
-            oriX = np.arange(oriY.size) / self.Fs
-            newX = np.arange(oriY.size) / Fs
-            self.voz = np.interp(newX, oriX, oriY)
+        self.voz = cambiaFrecuencia(self.voz, self.Fs, Fs)
         self.Fs = Fs
 
+    def audioLargo(self):
+        # con un audio largo sin cargar solo se puede extraer y probar
+        if self.archivo != "":
+            QMessageBox.about(self, "Advice", "long audio, only extract or test...")
+            return True
+        return False
+
     def exportAudio(self):
+        if self.audioLargo():
+            return
         fileDir, _ = QFileDialog.getSaveFileName(caption="Export Audio",
                                                  filter="Audio File (*.wav)")
         if fileDir:
@@ -539,33 +598,37 @@ class GUI(QWidget):
                 QMessageBox.about(self, "Error!", "cant export audio...")
 
     def extractOpt(self):
-        self.generalExtract(self.hiloExtractOpt)
+        self.generalExtract(True)
 
     def extractLow(self):
-        self.generalExtract(self.hiloExtractLow)
+        self.generalExtract(False)
 
-    def generalExtract(self, hilo):
-        if self.voz.size == 0:
+    def generalExtract(self, optimo):
+        if self.voz.size == 0 and self.archivo == "":
             QMessageBox.about(self, "Advice", "need audio to work...")
         else:
             if self.textEtiqueta.text() == "":
                 QMessageBox.about(self, "Advice", "write some class name...")
             else:
-                if not self.ejecucion:
-                    self.ejecucion = True
-                    self.textEstado.setText("Ext...")
-                    hilo.voz = self.voz.copy()
-                    hilo.Fs = self.Fs
-                    hilo.name = self.textEtiqueta.text()
-                    try:
-                        hilo.particion = int(self.textCompact.text())
-                    except:
-                        hilo.particion = 10
-                    hilo.start()
-                else:
-                    QMessageBox.about(self, "Wait!", "process in execution...")
+                voz, Fs, archivo = self.voz.copy(), self.Fs, self.archivo
+                try:
+                    particion = int(self.textCompact.text())
+                except:
+                    particion = 10
+
+                def extrae(trabajo):
+                    if archivo != "":
+                        return extraeArchivo(archivo, particion, optimo)
+                    return extraeRasgos(voz, Fs, particion, optimo)
+
+                self.planificador.agrega(Trabajo("extract", extrae, medidor=self.medidor(),
+                                                 name=self.textEtiqueta.text(),
+                                                 particion=particion,
+                                                 metodo="opt" if optimo else "low"))
 
     def play(self):
+        if self.audioLargo():
+            return
         try:
             sd.play(self.voz.copy(), self.Fs)
         except:
@@ -573,7 +636,8 @@ class GUI(QWidget):
 
     def stop(self):
         sd.stop(True)
-        self.abortar = True
+        # aborta el entrenamiento y la escucha, los demas trabajos siguen
+        self.planificador.cancela(["train", "live"])
 
     def cutSignalBand(self):
         self.cutSignal(True)
@@ -582,6 +646,8 @@ class GUI(QWidget):
         self.cutSignal(False)
 
     def cutSignal(self, isBand):
+        if self.audioLargo():
+            return
         try:
             if self.textCutMin.text() == "":
                 limInf = 0
@@ -599,249 +665,226 @@ class GUI(QWidget):
                 self.voz = self.voz[limInf: limSup]
             else:
                 self.voz = np.append(self.voz[0: limInf], self.voz[limSup:])
-            self.graphLine(self.plotAudio, self.voz, self.Fs)
+            self.nuevaGrafica()
         except:
             QMessageBox.about(self, "Error!", "cant cut signal...")
 
     def recordSignal(self):
-        if not self.ejecucion:
-            self.ejecucion = True
-            self.textEstado.setText("Rec...")
+        try:
+            tiempo = min(30.0, max(1.0, float(self.textRecS.text())))
+        except:
+            tiempo = 1.0
+        self.planificador.agrega(Trabajo("record", lambda t: grabaAudio(tiempo, 16000),
+                                         ["microphone"]))
+
+    def liveTest(self):
+        if np.shape(self.patrones)[0] == 0 or self.pesW.size == 0:
+            QMessageBox.about(self, "Advice", "need net to work...")
+        else:
             try:
-                self.hiloRecord.tiempo = min(30.0, max(1.0, float(self.textRecS.text())))
+                ventana = min(30.0, max(0.2, float(self.textRecS.text())))
             except:
-                self.hiloRecord.tiempo = 1.0
-            self.hiloRecord.start()
-        else:
-            QMessageBox.about(self, "Wait!", "process in execution...")
+                ventana = 1.0
+            try:
+                particion = int(self.textCompact.text())
+            except:
+                particion = 10
+            # el live extrae con el mismo metodo de los patrones o la red
+            escucha = EscuchaDMNN(self.pesW.copy(), self.numK.copy(), 16000, particion, ventana,
+                                  optimo=self.metodo != "low")
+
+            def escuchar(trabajo):
+                # cada prediccion llega como avance del trabajo
+                if not trabajo.cancelado:
+                    escucha.corre(lambda prediction, latencia:
+                                  trabajo.avanza((prediction, latencia)))
+
+            def detiene():
+                escucha.activo = False
+
+            self.planificador.agrega(Trabajo("live", escuchar, ["microphone"], detiene=detiene,
+                                             medidor=self.medidor()))
 
     def importNet(self):
         fileDir, _ = QFileDialog.getOpenFileName(caption="Import DMNN",
-                                                 filter="Text File (*.txt)")
+                                                 filter="DMNN (*.txt *.rdsp)")
         if fileDir:
-            file = open(fileDir, "r")
-            txt = file.read().split("\n")
-            file.close()
+            if self.planificador.ultimo("net") is not None:
+                QMessageBox.about(self, "Wait!", "net in use, wait or stop...")
+                return
             try:
-                if txt[0].find("DMNN: ") == 0:
-                    pesos = txt[4].split(",")
-                    pesW = []
-                    for p in pesos:
-                        pesW.append(float(p))
-                    self.pesW = np.array(pesW, dtype=float)
-                    dendritas = txt[6].split(",")
-                    numK = []
-                    for d in dendritas:
-                        numK.append(int(d))
-                    self.numK = np.array(numK, dtype=int)
-                    self.textPesoW.setText("W: " + str(self.pesW.size))
-                    self.hiloTrainNet.error = np.zeros(0, dtype=float)
+                modelo = leeModelo(fileDir)
+                self.pesW, self.numK = modelo["pesW"], modelo["numK"]
+                self.textPesoW.setText("W: " + str(self.pesW.size))
+                if modelo["metodo"] is not None:
+                    self.metodo = modelo["metodo"]
+                # sin patrones cargados, la red pone sus nombres y particion
+                if self.patrones.size == 0:
+                    for i in range(min(len(modelo["salidas"]), len(self.className))):
+                        self.className[i].setText(modelo["salidas"][i])
+                    if modelo["particion"] is not None:
+                        self.textCompact.setText(str(modelo["particion"]))
+                self.curvaError = np.zeros(0, dtype=float)
             except:
                 QMessageBox.about(self, "Error!", "file cant be open...")
 
     def exportNet(self):
-        fileDir, _ = QFileDialog.getSaveFileName(caption="Export DMNN",
-                                                 filter="Text File (*.txt)")
+        fileDir, filtro = QFileDialog.getSaveFileName(
+            caption="Export DMNN", filter="Text File (*.txt);;Binary File (*.rdsp)")
         if fileDir:
-            # crear el archivo y escribir las cabeceras
-            file = open(fileDir, "w")
+            fileDir = rutaConFiltro(fileDir, filtro)
             try:
-                file.write("DMNN: SoundRecognitionDSP\n")
-                file.write("Dimension: Entradas, Clases\n")
-                file.write("14,3\n")
-                file.write("Pesos\n")
-                txt = ""
-                for p in range(self.pesW.size):
-                    txt += str(self.pesW[p]) + ","
-                txt = txt[:-1] + "\n"
-                file.write(txt)
-                file.write("DendritasPorClase\n")
-                txt = ""
-                for n in range(self.numK.size):
-                    txt += str(self.numK[n]) + ","
-                txt = txt[:-1] + "\n"
-                file.write(txt)
-                file.write("Activas\n")
-                txt = ""
-                for i in range(self.numK.sum()):
-                    txt += "1,"
-                txt = txt[:-1] + "\n"
-                file.write(txt)
-                file.write("NormalizacionH\n")
-                txt = ""
-                for i in range(14):
-                    txt += "1.,"
-                txt = txt[:-1] + "\n"
-                file.write(txt)
-                file.write("NormalizacionL\n")
-                txt = ""
-                for i in range(14):
-                    txt += "-1.,"
-                txt = txt[:-1] + "\n"
-                file.write(txt)
-                file.write("NormalizacionN: 0.0\n")
-                file.write("NombresSalidas: ")
-                txt = ""
-                for i in range(self.numK.size):
-                    txt += "Class" + str(i) + ", "
-                txt = txt[:-2] + "\n"
-                file.write(txt)
-                file.write("NombresEntradas: Pitch, n0, n1, n2, n3, n4, n5, " +
-                           "n6, n7, n8, n9, n10, n11, n12\n")
+                escribeRed(fileDir, self.pesW, self.numK, self.nombresClases(),
+                           self.metodo, self.particion)
             except:
                 QMessageBox.about(self, "Error!", "invalid data to write...")
-            file.close()
 
     def newNet(self):
         if self.patrones.size == 0:
             QMessageBox.about(self, "Advice!", "need patterns to run...")
         else:
-            if not self.ejecucion:
-                self.ejecucion = True
-                self.textEstado.setText("Ini...")
-                self.hiloNewNet.patrones = self.patrones.copy()
-                try:
-                    self.hiloNewNet.clusters = int(self.textClusters.text())
-                except:
-                    self.hiloNewNet.clusters = 1
-                try:
-                    self.hiloNewNet.iteraciones = int(self.textIteracion.text())
-                except:
-                    self.hiloNewNet.iteraciones = 100
-                try:
-                    self.hiloNewNet.dimCajas = float(self.textHipercaja.text())
-                except:
-                    self.hiloNewNet.dimCajas = 10.0
-                self.hiloNewNet.start()
-            else:
-                QMessageBox.about(self, "Wait!", "process in execution...")
+            patrones = self.patrones.copy()
+            try:
+                clusters = int(self.textClusters.text())
+            except:
+                clusters = 1
+            try:
+                iteraciones = int(self.textIteracion.text())
+            except:
+                iteraciones = 100
+            try:
+                dimCajas = float(self.textHipercaja.text())
+            except:
+                dimCajas = 10.0
+            # con pocos datos no vale la pena arrancar procesos
+            procesos = os.cpu_count() or 1
+            if np.shape(patrones)[0] * clusters <= 100000:
+                procesos = 1
+            medidor = self.medidor()
+            crea = self.planificador.agrega(Trabajo(
+                "init", lambda t: inicializaDMNN(patrones, clusters, iteraciones, dimCajas,
+                                                 procesos), ["net"], medidor=medidor))
+            self.accuracyDespues(patrones, crea, medidor)
 
     def trainNet(self):
         if self.pesW.size == 0 or self.patrones.size == 0:
             QMessageBox.about(self, "Advice!", "need data to work...")
         else:
-            if not self.ejecucion:
-                self.ejecucion = True
-                self.textEstado.setText("Tra...")
-                self.hiloTrainNet.patrones = self.patrones.copy()
-                self.hiloTrainNet.pesW = self.pesW.copy()
-                self.hiloTrainNet.numK = self.numK.copy()
-                try:
-                    muta = float(self.textMutacion.text()) / 100.0
-                except:
-                    muta = 0.01
-                self.hiloTrainNet.muta = np.max(self.patrones[:, :-1]) * muta
-                try:
-                    self.hiloTrainNet.iteracion = [0, max(1, int(self.textIteracion.text()))]
-                except:
-                    self.hiloTrainNet.iteracion = [0, 100]
-                if self.hiloTrainNet.error.size == 0:
-                    e = self.hiloTrainNet.funError(self.hiloTrainNet.pesW)
-                    self.hiloTrainNet.error = np.array([0, e], dtype=float)
-                self.abortar = False
-                self.hiloTrainNet.start()
-            else:
-                QMessageBox.about(self, "Wait!", "process in execution...")
+            patrones = self.patrones.copy()
+            try:
+                muta = float(self.textMutacion.text()) / 100.0
+            except:
+                muta = 0.01
+            try:
+                iteraciones = max(1, int(self.textIteracion.text()))
+            except:
+                iteraciones = 100
+            modo = self.comboModo.currentText()
+            fijo = self.checkFijo.isChecked()
+            try:
+                paciencia = int(self.textPaciencia.text())
+            except:
+                paciencia = 0
+            self.textParada.setText("Stop: -")
+            # si hay una red creandose o entrenandose se sigue con la que deje
+            previo = self.planificador.ultimo("net")
+            pesW, numK = self.pesW.copy(), self.numK.copy()
+            curva = self.curvaError.copy() if previo is None else np.zeros(0, dtype=float)
+
+            def entrena(trabajo):
+                red = EntrenaDMNN()
+                trabajo.datos["red"] = red
+                red.patrones = patrones
+                red.pesW, red.numK = pesW, numK
+                if previo is not None:
+                    red.pesW, red.numK = previo.resultado[0].copy(), previo.resultado[1].copy()
+                red.muta = np.max(patrones[:, :-1]) * muta
+                red.iteracion = [0, iteraciones]
+                red.modo = modo
+                red.adapta = not fijo
+                red.paciencia = paciencia
+                red.error = curva
+                if curva.size == 0:
+                    red.error = np.array([0, red.funError(red.pesW)], dtype=float)
+                red.entrena(trabajo.avanza, lambda: trabajo.cancelado)
+                return red.pesW, red.numK
+
+            medidor = self.medidor()
+            entreno = self.planificador.agrega(Trabajo("train", entrena, ["net"], [previo],
+                                                       medidor=medidor))
+            self.accuracyDespues(patrones, entreno, medidor)
 
     def accuracyNet(self):
-        if not self.ejecucion:
-            self.ejecucion = True
-            self.textEstado.setText("Acc...")
-            self.hiloAccuracyNet.pesW = self.pesW.copy()
-            self.hiloAccuracyNet.numK = self.numK.copy()
-            self.hiloAccuracyNet.patrones = self.patrones.copy()
-            self.hiloAccuracyNet.start()
+        if self.pesW.size == 0 or self.patrones.size == 0:
+            QMessageBox.about(self, "Advice!", "need data to work...")
         else:
-            QMessageBox.about(self, "Wait!", "process in execution...")
+            patrones, pesW, numK = self.patrones.copy(), self.pesW.copy(), self.numK.copy()
+            self.planificador.agrega(Trabajo("accuracy",
+                                             lambda t: matrizConfusion(patrones, pesW, numK),
+                                             medidor=self.medidor()))
+
+    def accuracyDespues(self, patrones, previo, medidor):
+        # precision de la red que deja el trabajo previo (init o train), corre
+        # cuando este acaba y sus medidas siguen sumando en el mismo medidor
+        self.planificador.agrega(Trabajo("accuracy",
+                                         lambda t: matrizConfusion(patrones, *previo.resultado),
+                                         depende=[previo], medidor=medidor))
 
     def testNetOpt(self):
-        self.generalTest(self.hiloTestOpt)
+        self.generalTest(True)
 
     def testNetLow(self):
-        self.generalTest(self.hiloTestLow)
+        self.generalTest(False)
 
-    def generalTest(self, hilo):
-        if self.voz.size == 0 or np.shape(self.patrones)[0] == 0 or self.pesW.size == 0:
+    def generalTest(self, optimo):
+        if (self.voz.size == 0 and self.archivo == "") or np.shape(self.patrones)[0] == 0 or\
+                self.pesW.size == 0:
             QMessageBox.about(self, "Advice", "need audio or net to work...")
         else:
-            if not self.ejecucion:
-                self.ejecucion = True
-                self.textEstado.setText("Tes...")
-                hilo.voz = self.voz.copy()
-                hilo.Fs = self.Fs
-                hilo.pesW = self.pesW
-                hilo.numK = self.numK
-                try:
-                    hilo.particion = int(self.textCompact.text())
-                except:
-                    hilo.particion = 10
-                hilo.start()
-            else:
-                QMessageBox.about(self, "Wait!", "process in execution...")
+            voz, Fs, archivo = self.voz.copy(), self.Fs, self.archivo
+            pesW, numK = self.pesW.copy(), self.numK.copy()
+            try:
+                particion = int(self.textCompact.text())
+            except:
+                particion = 10
+
+            def prueba(trabajo):
+                if archivo != "":
+                    return probarArchivo(archivo, pesW, numK, particion, optimo)
+                return probarAudio(voz, Fs, pesW, numK, particion, optimo)
+
+            self.planificador.agrega(Trabajo("test", prueba, medidor=self.medidor()))
 
     def importPatterns(self):
         fileDir, _ = QFileDialog.getOpenFileName(caption="Import Patterns",
-                                                 filter="Text File (*.txt)")
+                                                 filter="Patterns (*.txt *.pdsp)")
         if fileDir:
-            file = open(fileDir, "r")
-            txt = file.read().split("\n")
-            file.close()
             try:
-                if txt[0].find("Patrones: ") == 0 and txt[1].find("Salidas: ") == 0 and\
-                        txt[2].find("Entradas: ") == 0:
-                    self.limpiarInfo(True)
-                    self.textTituPat.setText("(0) " + txt[0][10:])
-                    names = txt[1][9:].split(", ")
-                    for i in range(len(names)):
-                        self.className[i].setText(names[i])
-                    patrones = []
-                    txt = txt[3:]
-                    for p in range(len(txt)):
-                        if txt[p] != "":
-                            patrones.append([])
-                            nums = txt[p].split(", ")
-                            for n in range(15):
-                                patrones[-1].append(float(nums[n]))
-                    self.patrones = np.array(patrones)
-                    self.hiloTrainNet.error = np.zeros(0, dtype=float)
-                    self.calculaInfoPatrones()
+                titulo, names, patrones = leePatrones(fileDir)
+                self.limpiarInfo(True)
+                self.textTituPat.setText("(0) " + titulo)
+                for i in range(len(names)):
+                    self.className[i].setText(names[i])
+                self.patrones = patrones
+                self.curvaError = np.zeros(0, dtype=float)
+                self.calculaInfoPatrones()
             except:
                 QMessageBox.about(self, "Error!", "invalid format...")
 
     def exportPatterns(self):
-        fileDir, _ = QFileDialog.getSaveFileName(caption="Export Patterns",
-                                                 filter="Text File (*.txt)")
+        fileDir, filtro = QFileDialog.getSaveFileName(
+            caption="Export Patterns", filter="Text File (*.txt);;Binary File (*.pdsp)")
         if fileDir:
+            fileDir = rutaConFiltro(fileDir, filtro)
             # obtener el nombre del set de patrones y ponerlo en GUI
-            titulo = os.path.basename(fileDir).replace(".txt", "")
+            titulo = os.path.splitext(os.path.basename(fileDir))[0]
             total = self.textTituPat.text().split(")")
             self.textTituPat.setText(total[0] + ") " + titulo)
-            # crear el archivo y escribir las cabeceras
-            file = open(fileDir, "w")
             try:
-                file.write("Patrones: " + titulo + "\n")
-                file.write("Salidas: ")
-                names = ""
-                for i in range(len(self.className)):
-                    if self.className[i].text() != "...":
-                        names += self.className[i].text() + ", "
-                names = names[:-2] + "\n"
-                file.write(names)
-                file.write("Entradas: Pitch")
-                for i in range(13):
-                    file.write(", n" + str(i))
-                file.write("\n")
-                # escribir los datos como tal
                 np.random.shuffle(self.patrones)
-                txt = ""
-                for p in range(np.shape(self.patrones)[0]):
-                    for n in range(15):
-                        txt += str(self.patrones[p, n]) + ", "
-                    txt = txt[:-2] + "\n"
-                file.write(txt)
+                escribePatrones(fileDir, titulo, self.nombresClases(), self.patrones)
             except:
                 QMessageBox.about(self, "Error!", "invalid data to write...")
-            file.close()
 
     def patternsCut(self):
         np.random.shuffle(self.patrones)
@@ -856,7 +899,7 @@ class GUI(QWidget):
                     break
         if ok:
             self.calculaInfoPatrones()
-            self.hiloTrainNet.error = np.zeros(0, dtype=float)
+            self.curvaError = np.zeros(0, dtype=float)
             self.limpiarInfo(False)
         else:
             self.patrones = antik
@@ -864,26 +907,74 @@ class GUI(QWidget):
 
     def patternsClean(self):
         self.textTituPat.setText("(0) ...")
-        self.hiloTrainNet.error = np.zeros(0, dtype=float)
+        self.curvaError = np.zeros(0, dtype=float)
         self.patrones = np.zeros((0, 15), dtype=float)
+        self.metodo = None
+        self.particion = None
         self.limpiarInfo(True)
 
     def graphLine(self, axes, data, Fs):
         try:
             axes.chart().removeAllSeries()
-            L = data.size
-            tiempo = np.arange(L) / Fs
-            paso = int(np.ceil(L / 3000))
+            paso = max(1, int(np.ceil(data.size / 3000)))
+            tiempo = np.arange(0, data.size, paso) / Fs
             linea = QLineSeries()
             linea.setColor(Qt.blue)
-            for x in range(0, L, paso):
-                linea.append(tiempo[x], data[x])
+            linea.replace(puntosSerie(tiempo, data[::paso]))
             axes.chart().addSeries(linea)
             axes.chart().createDefaultAxes()
             axes.chart().legend().setVisible(False)
         except:
             pass
 
+    def nuevaGrafica(self, fuente=None):
+        # arma las envolventes del audio (o del archivo largo) y lo grafica entero
+        if fuente is None:
+            self.piramide = PiramideAudio.desdeVoz(self.voz, self.Fs)
+        else:
+            self.piramide = PiramideAudio.desdeFuente(fuente)
+        try:
+            chart = self.plotAudio.chart()
+            chart.removeAllSeries()
+            linea = QLineSeries()
+            linea.setColor(Qt.blue)
+            chart.addSeries(linea)
+            chart.createDefaultAxes()
+            chart.legend().setVisible(False)
+            chart.axes(Qt.Vertical)[0].setRange(self.piramide.limites[0],
+                                                self.piramide.limites[1])
+        except:
+            pass
+        self.zoomAudio(0.0, self.piramide.duracion())
+
+    def zoomAudio(self, t0, t1):
+        # la serie se rellena de una vez con el nivel que toca para el rango
+        try:
+            self.vistaAudio = [t0, t1]
+            tiempo, valores = self.piramide.ventana(t0, t1)
+            chart = self.plotAudio.chart()
+            chart.series()[0].replace(puntosSerie(tiempo, valores))
+            chart.axes(Qt.Horizontal)[0].setRange(t0, max(t1, t0 + 1.0 / self.piramide.Fs))
+        except:
+            pass
+
+    def eventFilter(self, objeto, evento):
+        # la rueda del mouse sobre la grafica de audio hace zoom en el tiempo
+        if objeto is self.plotAudio.viewport() and evento.type() == QEvent.Wheel:
+            serie = self.plotAudio.chart().series()
+            duracion = self.piramide.duracion()
+            if len(serie) > 0 and duracion > 0:
+                t0, t1 = self.vistaAudio
+                centro = self.plotAudio.chart().mapToValue(QPointF(evento.pos()), serie[0]).x()
+                centro = min(max(centro, t0), t1)
+                factor = 0.8 if evento.angleDelta().y() > 0 else 1.25
+                ancho = min(max((t1 - t0) * factor, 20.0 / self.piramide.Fs), duracion)
+                t0 = centro - (centro - t0) * ancho / max(t1 - t0, 1e-9)
+                t0 = min(max(t0, 0.0), duracion - ancho)
+                self.zoomAudio(t0, t0 + ancho)
+            return True
+        return QWidget.eventFilter(self, objeto, evento)
+
     def acercade(self):
         txt = "($$$) Software for Sound Recognition, here you\n" \
              "import or record audio, next a classification system\n" \
@@ -896,111 +987,138 @@ class GUI(QWidget):
         txt = txt.replace("$$$", self.version)
         QMessageBox.about(self, "Acerca de SoundRecognitionDSP", txt)
 
-    def finHiloRecord(self):
-        self.ejecucion = False
-        self.textEstado.setText("...")
-        self.voz = self.hiloRecord.voz.copy()
-        self.Fs = self.hiloRecord.Fs
-        self.graphLine(self.plotAudio, self.voz, self.Fs)
+    def medidor(self):
+        return Medidor(self.checkMemoria.isChecked())
 
-    def finHiloExtractOpt(self):
-        self.finGeneralExtract(self.hiloExtractOpt)
-
-    def finHiloExtractLow(self):
-        self.finGeneralExtract(self.hiloExtractLow)
+    def closeEvent(self, evento):
+        # los trabajos en cola se cancelan, los que corren acaban solos
+        sd.stop(True)
+        self.planificador.cierra()
+        QWidget.closeEvent(self, evento)
+
+    def avisoTrabajo(self, trabajo, evento):
+        # avisos del planificador, ya en el hilo de la GUI
+        if evento == "progress":
+            if trabajo.tipo == "train":
+                self.avanceTrain(trabajo.avance)
+            elif trabajo.tipo == "live":
+                self.resultadoEscucha(*trabajo.avance)
+            return
+        if evento == "end":
+            if trabajo.medidor is not None:
+                self.textMedidas.setText(trabajo.medidor.texto())
+            if trabajo.estado == "failed":
+                QMessageBox.about(self, "Error!", trabajo.tipo + " failed: " + str(trabajo.error))
+            elif trabajo.estado == "done":
+                self.finTrabajo(trabajo)
+        self.mostrarEstado()
+
+    def mostrarEstado(self):
+        # los trabajos que corren (Ext, Tra...) y cuantos esperan en la cola
+        corriendo, esperando = self.planificador.activos()
+        txt = [t[:3].capitalize() for t in corriendo]
+        if len(esperando) > 0:
+            txt.append("+" + str(len(esperando)))
+        self.textEstado.setText(" ".join(txt) + "...")
+
+    def finTrabajo(self, trabajo):
+        if trabajo.tipo == "record":
+            self.finRecord(trabajo)
+        elif trabajo.tipo == "extract":
+            self.finExtract(trabajo)
+        elif trabajo.tipo == "init":
+            self.finNewNet(trabajo)
+        elif trabajo.tipo == "train":
+            self.finTrainNet(trabajo)
+        elif trabajo.tipo == "accuracy":
+            self.finAccuracyNet(trabajo)
+        elif trabajo.tipo == "test":
+            self.mostrarPrediccion(trabajo.resultado)
+
+    def finRecord(self, trabajo):
+        self.voz = trabajo.resultado.copy()
+        self.Fs = 16000
+        self.archivo = ""
+        self.nuevaGrafica()
 
-    def finGeneralExtract(self, hilo):
-        self.ejecucion = False
-        self.textEstado.setText("...")
+    def finExtract(self, trabajo):
+        name = trabajo.datos["name"]
         # buscar si ya existe la clase, sino crearla
         ind = -1
         for i in range(len(self.className)):
-            if self.className[i].text() == hilo.name:
+            if self.className[i].text() == name:
                 ind = i
                 break
         if ind == -1:
             for i in range(len(self.className)):
                 if self.className[i].text() == "...":
-                    self.className[i].setText(hilo.name)
+                    self.className[i].setText(name)
                     ind = i
                     break
         if ind == -1:
             QMessageBox.about(self, "Advice!", "no more slots for classes...")
         else:
             # agregar los datos a los patrones
-            bloque = hilo.param.copy()
-            aux = np.ones((np.shape(bloque)[0], 1)) * hilo.tono
-            bloque = np.concatenate((aux, bloque), axis=1)
-            aux = np.ones((np.shape(bloque)[0], 1)) * ind
-            bloque = np.concatenate((bloque, aux), axis=1)
+            param, tono = trabajo.resultado
+            bloque = bloquePatrones(param, tono, ind)
             self.patrones = np.concatenate((self.patrones, bloque), axis=0)
+            self.metodo = trabajo.datos["metodo"]
+            self.particion = trabajo.datos["particion"]
             # modifica los datos de informacion
-            self.hiloTrainNet.error = np.zeros(0, dtype=float)
+            self.curvaError = np.zeros(0, dtype=float)
             self.calculaInfoPatrones()
             self.limpiarInfo(False)
 
-    def finHiloNewNet(self):
-        self.ejecucion = False
-        self.textEstado.setText("...")
-        self.pesW = self.hiloNewNet.pesW.copy()
-        self.numK = self.hiloNewNet.numK.copy()
+    def finNewNet(self, trabajo):
+        self.pesW = trabajo.resultado[0].copy()
+        self.numK = trabajo.resultado[1].copy()
         self.textPesoW.setText("W: " + str(self.pesW.size))
-        self.hiloTrainNet.error = np.zeros(0, dtype=float)
-        self.accuracyNet()
-
-    def finHiloTrainNet(self):
-        self.textGo.setText("Go%: " + str(int((float(self.hiloTrainNet.iteracion[0]) /
-                                               self.hiloTrainNet.iteracion[1]) * 100.0)))
-        self.graphLine(self.plotTrain, self.hiloTrainNet.error, 0.1)
-        if self.hiloTrainNet.iteracion[0] < self.hiloTrainNet.iteracion[1] and not self.abortar:
-            self.hiloTrainNet.start()
-        else:
-            self.ejecucion = False
-            self.textEstado.setText("...")
-            self.pesW = self.hiloTrainNet.pesW.copy()
-            self.accuracyNet()
-
-    def finHiloAccuracyNet(self):
-        self.ejecucion = False
-        self.textEstado.setText("...")
+        self.curvaError = np.zeros(0, dtype=float)
+
+    def avanceTrain(self, red):
+        self.textGo.setText("Go%: " + str(int((float(red.iteracion[0]) /
+                                               red.iteracion[1]) * 100.0)))
+        self.textVelocidad.setText("It/s: " + str(round(red.velocidad, 1)))
+        self.graphLine(self.plotTrain, red.error, 0.1)
+
+    def finTrainNet(self, trabajo):
+        red = trabajo.datos["red"]
+        self.pesW = red.pesW.copy()
+        self.numK = red.numK.copy()
+        self.textPesoW.setText("W: " + str(self.pesW.size))
+        self.curvaError = red.error.copy()
+        self.textParada.setText("Stop: " + red.parada)
+
+    def finAccuracyNet(self, trabajo):
         try:
             # limpiar las casillas
             for i in range(len(self.className)):
                 self.classExacti[i].setText("")
                 self.classSensi[i].setText("")
             # hacer los calculos para cada clase
-            matrix = self.hiloAccuracyNet.matrix
-            for i in range(np.shape(matrix)[0]):
-                # hallar la exactitud en ingles precision
-                num = float(matrix[i, i]) / max(1, matrix[:, i].sum())
-                self.classExacti[i].setText(str(int(num * 100.0)))
-                # hallar la sensibilidad
-                num = float(matrix[i, i]) / max(1, matrix[i, :].sum())
-                self.classSensi[i].setText(str(int(num * 100.0)))
+            exacti, sensi, num = metricasConfusion(trabajo.resultado)
+            for i in range(exacti.size):
+                self.classExacti[i].setText(str(int(exacti[i] * 100.0)))
+                self.classSensi[i].setText(str(int(sensi[i] * 100.0)))
             # agregar la accuracy general
-            num = float(np.diagonal(matrix).sum()) / max(1, matrix.sum())
             self.textAccuracy.setText("Acc%: " + str(round(num * 100.0, 2)))
         except:
             pass
 
-    def finHiloTestOpt(self):
-        self.finGeneralTest(self.hiloTestOpt)
-
-    def finHiloTestLow(self):
-        self.finGeneralTest(self.hiloTestLow)
+    def resultadoEscucha(self, prediction, latencia):
+        self.textEstado.setText("Liv " + str(int(latencia * 1000.0)) + "ms")
+        self.mostrarPrediccion(prediction)
 
-    def finGeneralTest(self, hilo):
-        self.ejecucion = False
-        self.textEstado.setText("...")
+    def mostrarPrediccion(self, prediction):
         # poner los resultados
         for i in range(len(self.classResult)):
             self.classResult[i].setText("")
-        winner = np.argmax(hilo.prediction)
-        for i in range(hilo.prediction.size):
+        winner = np.argmax(prediction)
+        for i in range(prediction.size):
             if i == winner:
-                self.classResult[i].setText("(" + str(int(hilo.prediction[i] * 100.0)) + ")")
+                self.classResult[i].setText("(" + str(int(prediction[i] * 100.0)) + ")")
             else:
-                self.classResult[i].setText(str(int(hilo.prediction[i] * 100.0)))
+                self.classResult[i].setText(str(int(prediction[i] * 100.0)))
 
     def calculaInfoPatrones(self):
         # poner el numero de patrones para las clases en info
@@ -1014,6 +1132,13 @@ class GUI(QWidget):
         num = np.shape(self.patrones)[0]
         self.textTituPat.setText("(" + str(num) + ")" + titulo[1])
 
+    def nombresClases(self):
+        names = []
+        for i in range(len(self.className)):
+            if self.className[i].text() != "...":
+                names.append(self.className[i].text())
+        return names
+
     def limpiarInfo(self, nombresTambien):
         self.textAccuracy.setText("Acc%: 0")
         for i in range(len(self.className)):
@@ -1026,116 +1151,17 @@ class GUI(QWidget):
 
 # funciones externas o globales
 
-def sacarPitch(sound, fs):
-    return 0.0
-
-def meanTrozos(matrix, grupo):
-    L = np.shape(matrix)
-    output = np.zeros((0, L[1]), dtype=float)
-    n = 0
-    while n < L[0]:
-        aux = np.mean(matrix[n: min(L[0], n + grupo), :], axis=0)
-        output = np.append(output, np.atleast_2d(aux), axis=0)
-        n += grupo
-    return output.copy()
-
-def ExecuteDMNN(entrada, pesW, numK, softmax):
-    X = entrada.copy()
-    while X.size < pesW.size / 2:
-        X = np.hstack((X, entrada))
-    W = pesW.copy().reshape(-1, 2)
-    WH = W[:, 0] - X
-    WL = X - W[:, 1]
-    Wmki = np.minimum(WH, WL)
-    Wmki = Wmki.reshape(-1, entrada.size)
-    Smk = Wmki.min(axis=1)
-    Zm = np.zeros(numK.size)
-    n = 0
-    for m in range(Zm.size):
-        Zm[m] = Smk[n:(n + numK[m])].max()
-        n += numK[m]
-    if softmax:
-        Zm = np.exp(Zm)
-        Ym = Zm / min(Zm.sum(), 1000000.0)
-        return Ym
-    else:
-        y = np.argmax(Zm)
-        return y
-
-def multiExecuteDMNN(param, tono, pesW, numK):
-    L = np.shape(param)[0]
-    entrada = param
-    aux = np.ones((L, 1)) * tono
-    entrada = np.concatenate((aux, entrada), axis=1)
-    prediction = np.zeros(numK.size, dtype=float)
-    for e in range(L):
-        prediction += ExecuteDMNN(entrada[e, :], pesW, numK, True)
-    prediction /= L
-    return prediction
-
-def ourMFCC(signal, fs, alpha=0.97, frame_size=20e-03, frame_overlap=10e-03,
-            fft_points=320, fft_power=False, f_low=60, f_high=16e03,
-            filter_order=14, MFCC_coef=13):
-    samples = len(signal)
-    # se hace un preenfasis, para borrar las frecuencias
-    signal_alpha = np.append(signal[0], signal[1:] - alpha * signal[:-1])
-    # Encuentro el numero de muestra que se toma por frame y el numero de muestras de solapamiento
-    frame_length, frame_step = int(round(frame_size * fs)), int(round(frame_overlap * fs))
-    # total de frames que se generan parcialmente
-    num_frames = int(np.ceil(float(abs(samples - frame_length) / frame_step)))
-    # cada path va a tener el numero de muestras por solapamiento mas el tamaño de cada frame
-    pad_signal_length = num_frames * frame_step + frame_length
-    # Se añaden los datos extras debidos a los solapamientos
-    zeros = np.zeros((pad_signal_length - samples))
-    pad_signal = np.append(signal_alpha, zeros)
-    # creamos los indices necesarios para cada frame
-    index = np.tile(np.arange(0, frame_length), (num_frames, 1)) +\
-            np.tile(np.arange(0, num_frames * frame_step, frame_step), (frame_length, 1)).T
-    frames = pad_signal[index.astype(np.int32, copy=False)]
-    # multiplico por ventana hamming los frames
-    signal_frames = frames * np.hamming(frame_length)
-
-    # hallo la magnitud de la transformada de fourier
-    fft_frames = fftn(signal_frames)
-    fft_frames_mag = np.abs(fft_frames)
-    # Elijo los datos de la transformada de fourier
-    fft_frames_mag = fft_frames_mag[:][:, 0: fft_points] / fft_points
-    if fft_power:
-        fft_frames_mag = (fft_frames_mag ** 2)
-
-    # genero las ecuaciones para transformar los datos
-    hz2mel = lambda hz: 2595 * np.log10(1 + hz / 700)
-    mel2hz = lambda mel: 700 * (10 ** (mel / 2595) - 1)
-    # se transforman los limites del filtro a unidades de mel
-    mel_low = hz2mel(f_low)
-    mel_high = hz2mel(f_high)
-    # Se genera los puntos en escala de mel
-    mel = np.linspace(mel_low, mel_high, filter_order + 2)
-    # transforma la frecuencia del mel a herz
-    mel_hz = mel2hz(mel)
-    # Inicia la creacion de los coeficientes mel
-    f_i = np.floor((fft_points + 1) * mel_hz) / fs
-    # Reservo memoria para el filtro mel
-    Hm = np.zeros((filter_order, int(np.floor(fft_points))))
-    # Genero el filtro Mel
-    for m in range(1, filter_order + 1):
-        f_m_1 = int(f_i[m - 1])
-        f_m = int(f_i[m])
-        f_m_plus_1 = int(f_i[m + 1])
-        for k in range(f_m_1, f_m):
-            Hm[m - 1, k] = (k - f_i[m - 1]) / (f_i[m] - f_i[m - 1])
-        for k in range(f_m, f_m_plus_1):
-            Hm[m - 1, k] = (f_i[m + 1] - k) / (f_i[m + 1] - f_i[m])
-    Hm = np.where(Hm == 0, np.finfo(float).eps, Hm)  # Numerical Stability
-
-    frames_filtered = np.dot(fft_frames_mag, Hm.T)
-
-    frames_filtered_log = 20 * np.log10(frames_filtered)
-
-    miMFCC = dct(frames_filtered_log, type=2, axis=1, norm='ortho')
-    miMFCC = miMFCC[:, 1: MFCC_coef + 1]
-
-    return miMFCC
+def puntosSerie(x, y):
+    # lista de puntos para QLineSeries.replace, de una sola vez
+    return [QPointF(a, b) for a, b in zip(x.tolist(), y.tolist())]
+
+def rutaConFiltro(ruta, filtro):
+    # el formato lo decide la extension, si el nombre no tiene la del filtro
+    # elegido se le agrega, asi con Text File nunca se escribe binario
+    extension = filtro[filtro.rfind("*") + 1:filtro.rfind(")")]
+    if extension != "" and not ruta.lower().endswith(extension):
+        ruta += extension
+    return ruta
 
 def estilo(esc):
     # aqui se editan los estilos de los widgets de la GUI
@@ -1170,7 +1196,9 @@ def tooltips(titulo):
     elif titulo == "record":
         txt = "start recording audio, wait 0.5 s to start"
     elif titulo == "recTime":
-        txt = "record time in seconds, default 3 s"
+        txt = "record time in seconds, default 3 s, in live is the window"
+    elif titulo == "live":
+        txt = "recognize the microphone continuously, stop button ends it"
     elif titulo == "compact":
         txt = "amount of data to compact with mean, default 10"
     elif titulo == "accuracy":
@@ -1204,226 +1232,55 @@ def tooltips(titulo):
     elif titulo == "netNew":
         txt = "create a new DMNN (an ANN) dont need mutation parameter"
     elif titulo == "netMutar":
-        txt = "mutation for genetic train, default 1 %"
+        txt = "initial mutation for genetic, delta and population train, default 1 %, " \
+              "each dendrite adapts its step unless Fixed step is on"
+    elif titulo == "netFijo":
+        txt = "use the same mutation for all the weights all the train, without adapting it"
+    elif titulo == "netPaciencia":
+        txt = "stop the train after these iterations without improving the error, " \
+              "0 automatic, -1 never"
+    elif titulo == "infoParada":
+        txt = "why the last train ended: iterations, stall, error 0, converged or stopped"
     elif titulo == "netItera":
         txt = "number of iterations for initialization or train, default 100"
+    elif titulo == "infoVel":
+        txt = "train speed, iterations (or generations) per second"
     elif titulo == "infoGo":
         txt = "show the percentage of train ok"
+    elif titulo == "netModo":
+        txt = "train mode: genetic all weights, delta one dendrite, population in parallel, " \
+              "boxes grows and shrinks dendrites from the patterns (fast, adds dendrites)"
     elif titulo == "netTrain":
         txt = "execute the train of the net, dont need clusters or size parameters"
     elif titulo == "stop":
-        txt = "stop the playing audio, or if training, abort the train"
+        txt = "stop the playing audio, abort the train and the live test"
     elif titulo == "play":
         txt = "play the audio"
     elif titulo == "estado":
-        txt = "show the system internal state"
+        txt = "processes running now, +N waiting in the queue"
+    elif titulo == "stats":
+        txt = "time, calls and peak memory of each stage of the last process"
+    elif titulo == "memoria":
+        txt = "measure also the peak memory of the next processes, it makes them slower (the train too)"
     else:
         txt = "?"
     return txt
 
-def Kmedias(matrix, clusters, iteraciones):
-    # crear las estructuras de datos y la inicializacion al azar
-    L = np.shape(matrix)[0]
-    aux = np.zeros((L, 1))
-    puntos = np.concatenate((matrix, aux), axis=1)
-    dMax = np.max(matrix, axis=0)
-    dMin = np.min(matrix, axis=0)
-    centros = np.random.random_sample((clusters, np.shape(matrix)[1]))
-    centros = (dMax - dMin) * centros + dMin
-    # comenzar el ciclo con sus dos partes
-    i = 0
-    while i < iteraciones:
-        i += 1
-        fin = True
-        # asociar los puntos al centroide mas cercano
-        for p in range(L):
-            dist = np.sum(np.power(centros - puntos[p, :-1], 2), axis=1)
-            puntos[p, -1] = np.argmin(dist)
-        # mover los centroides a sus puntos asociados
-        for c in range(clusters):
-            viejo = centros[c, :].copy()
-            t = 0.0
-            encola = True
-            for p in range(L):
-                if puntos[p, -1] == c:
-                    if encola:
-                        encola = False
-                        centros[c, :] *= 0
-                    centros[c, :] += puntos[p, :-1]
-                    t += 1.0
-            centros[c, :] /= (t if t != 0 else 1.0)
-            # verificar si hubo cambios
-            if fin:
-                if not (False in (viejo == centros[c, :])):
-                    fin = False
-        # frenar si no hubo cambios, termina antes de iteraciones
-        if fin:
-            break
-    return centros
-
-def inicializaDMNN(patrones, clusters, iteraciones, dimCajas):
-    # calcular dimension de las hiper-cajas
-    dMax = np.max(patrones[:, :-1], axis=0)
-    dMin = np.min(patrones[:, :-1], axis=0)
-    dim = (dMax - dMin) * 0.5 * (dimCajas / 100.0)
-    # inicializar la red
-    numK = np.ones(int(patrones[:, -1].max() + 1), dtype=int) * clusters
-    pesW = np.array([])
-    # ciclo para obtener los centroides
-    for m in range(numK.size):
-        cen = Kmedias(patrones[patrones[:, -1] == m, :-1], clusters, iteraciones)
-        vH = (cen + dim).ravel()
-        vL = (cen - dim).ravel()
-        pesW = np.concatenate((pesW, np.dstack((vH, vL)).ravel()))
-    return pesW, numK
-
-# clases hilos
-
-class HiloRecord(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.tiempo = 1.0
-        self.Fs = 16000
-        self.voz = np.zeros(0, dtype=float)
-
-    def run(self):
-        sd.stop(True)
-        muestras = int((self.tiempo + 0.5) * self.Fs)
-        record = sd.rec(muestras, samplerate=self.Fs, channels=1)
-        sd.wait()
-        inicial = int(0.5 * self.Fs)
-        self.voz = record[inicial:, 0]
-        self.voz = self.voz.astype(float)
-
-class HiloTestOpt(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.voz = np.zeros(0, dtype=float)
-        self.Fs = 16000
-        self.pesW = np.array([0.0])
-        self.numK = np.array([0])
-        self.particion = 1
-        self.prediction = np.zeros(1, dtype=float)
-
-    def run(self):
-        param = meanTrozos(mfcc(self.voz, self.Fs), self.particion)
-        tono = sacarPitch(self.voz, self.Fs)
-        self.prediction = multiExecuteDMNN(param, tono, self.pesW, self.numK)
-
-class HiloTestLow(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.voz = np.zeros(0, dtype=float)
-        self.Fs = 16000
-        self.pesW = np.array([0.0])
-        self.numK = np.array([0])
-        self.particion = 1
-        self.prediction = np.zeros(1, dtype=float)
-
-    def run(self):
-        param = meanTrozos(ourMFCC(self.voz, self.Fs), self.particion)
-        tono = sacarPitch(self.voz, self.Fs)
-        self.prediction = multiExecuteDMNN(param, tono, self.pesW, self.numK)
-
-class HiloExtractOpt(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.voz = np.zeros(0, dtype=float)
-        self.Fs = 16000
-        self.name = ""
-        self.particion = 1
-        self.param = np.zeros((0, 13), dtype=float)
-        self.tono = 0
-
-    def run(self):
-        self.param = meanTrozos(mfcc(self.voz, self.Fs), self.particion)
-        self.tono = sacarPitch(self.voz, self.Fs)
-
-class HiloExtractLow(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.voz = np.zeros(0, dtype=float)
-        self.Fs = 16000
-        self.name = ""
-        self.particion = 1
-        self.param = np.zeros((0, 13), dtype=float)
-        self.tono = 0
-
-    def run(self):
-        self.param = meanTrozos(ourMFCC(self.voz, self.Fs), self.particion)
-        self.tono = sacarPitch(self.voz, self.Fs)
-
-class HiloNewNet(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.clusters = 1
-        self.iteraciones = 100
-        self.dimCajas = 10
-        self.patrones = np.zeros((0, 15), dtype=float)
-        self.pesW = np.array([0.0])
-        self.numK = np.array([0])
+# trabajos en segundo plano
 
-    def run(self):
-        self.pesW, self.numK = inicializaDMNN(self.patrones, self.clusters,
-                                              self.iteraciones, self.dimCajas)
+class AvisosTrabajo(QObject):
+    # el planificador avisa desde el hilo de cada trabajo, la señal lo lleva
+    # al hilo de la GUI
 
-class HiloTrainNet(QThread):
+    evento = pyqtSignal(object, str)
 
-    def __init__(self):
-        QThread.__init__(self)
-        self.patrones = np.zeros((0, 15), dtype=float)
-        self.pesW = np.array([0.0])
-        self.numK = np.array([0])
-        self.iteracion = [0, 100]
-        self.muta = 1.0
-        self.error = np.zeros(1, dtype=float)
-
-    def run(self):
-        error = self.error[-1]
-        limit = min(self.iteracion[0] + 10, self.iteracion[1])
-        while self.iteracion[0] < limit:
-            self.iteracion[0] += 1
-            hijo = self.pesW.copy() + (np.random.rand(self.pesW.size) * 2.0 - 1.0) * self.muta
-            newerror = self.funError(hijo)
-            if newerror <= error:
-                if newerror == 0:
-                    self.iteracion[0] = self.iteracion[1]
-                self.pesW = hijo.copy()
-                error = newerror
-        self.error = np.append(self.error, error)
-
-    def funError(self, pesW):
-        L = np.shape(self.patrones)[0]
-        res = 0.0
-        for p in range(L):
-            if self.patrones[p, -1] == ExecuteDMNN(self.patrones[p, :-1],
-                                                   pesW, self.numK, False):
-                res += 1.0
-        return 1.0 - (res / L)
-
-class HiloAccuracyNet(QThread):
-
-    def __init__(self):
-        QThread.__init__(self)
-        self.patrones = np.zeros((0, 15), dtype=float)
-        self.pesW = np.array([0.0])
-        self.numK = np.array([0])
-        self.matrix = np.zeros((0, 0), dtype=int)
-
-    def run(self):
-        self.matrix = np.zeros((self.numK.size, self.numK.size), dtype=int)
-        try:
-            for p in range(np.shape(self.patrones)[0]):
-                res = ExecuteDMNN(self.patrones[p, :-1], self.pesW, self.numK, False)
-                self.matrix[int(self.patrones[p, -1]), res] += 1
-        except:
-            pass
+def grabaAudio(tiempo, Fs):
+    sd.stop(True)
+    muestras = int((tiempo + 0.5) * Fs)
+    record = sd.rec(muestras, samplerate=Fs, channels=1)
+    sd.wait()
+    inicial = int(0.5 * Fs)
+    return record[inicial:, 0].astype(float)
 
 # funcion para generar parametros de compilacion en linea de comandos
 # (no usada en el software), (sin dependencias)
@@ -1438,11 +1295,12 @@ def compilador(img):
     print(com)
 
 # instanciar el software
-main()
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
 
 """
 Tareas:
-- hacer la funcion que devuelva el pitch (tono) en lugar de cero
 - boton para normalizar audio, o normalizarlo automaticamente...
 - error, desfase en chart respecto a cero, clic para hallar rangos de corte
 """
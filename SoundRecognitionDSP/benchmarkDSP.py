@@ -0,0 +1,249 @@
+# Proyecto Reconocimiento de Sonido por DSP UV 2020
+# Mide la velocidad de las partes pesadas del sistema: extraccion de rasgos
+# (ourMFCC contra el mfcc de python_speech_features, pitch, meanTrozos y el
+# cambio de frecuencia), inicializacion (Kmedias e inicializaDMNN),
+# entrenamiento (funError e iterar) e inferencia (ExecuteDMNN, con y sin
+# ModeloDMNN armado, contra batchExecuteDMNN y multiExecuteDMNN), con
+# patrones sinteticos de tamaño fijo y semillas fijas; guarda un JSON con
+# los datos de la maquina que se puede comparar con el de otro commit para
+# atrapar regresiones, ejemplo:
+#   python benchmarkDSP.py ../audiosVarios --repeat 5 --out base.json
+#   python benchmarkDSP.py ../audiosVarios --compare base.json --tolerance 1.25
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import numpy as np
+import scipy
+from python_speech_features import mfcc
+from nucleoDSP import leeAudio, cambiaFrecuencia, ourMFCC, sacarPitch, planFrecuencia,\
+    FlujoFrecuencia, meanTrozos, extraeRasgos, Kmedias, inicializaDMNN, inicializaDMNNlotes,\
+    EntrenaDMNN, ExecuteDMNN, batchExecuteDMNN, multiExecuteDMNN, ModeloDMNN
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarkDSP",
+                                     description="speed of extraction, init, train and test")
+    parser.add_argument("folder", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             "..", "audiosVarios"))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per method, best is kept")
+    parser.add_argument("--seconds", type=float, default=60.0,
+                        help="seconds of noise for the resampling test")
+    parser.add_argument("--rows", type=int, default=20000,
+                        help="rows of the synthetic patterns for init, train and test")
+    parser.add_argument("--classes", type=int, default=8, help="classes of the synthetic patterns")
+    parser.add_argument("--clusters", type=int, default=10, help="dendrites per class")
+    parser.add_argument("--only", nargs="+", default=SECCIONES,
+                        choices=SECCIONES, help="sections to run")
+    parser.add_argument("--out", default="", help="JSON file for the results")
+    parser.add_argument("--compare", default="", help="JSON of a previous run to compare")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slower than base by this factor is a regression")
+    args = parser.parse_args(argv)
+
+    informe = {"maquina": maquina(), "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "commit": commitActual(), "parametros": vars(args).copy(), "resultados": {}}
+    print(informe["maquina"]["procesador"] + "  cpus: " + str(informe["maquina"]["cpus"]) +
+          "  numpy " + informe["maquina"]["numpy"] + "  commit: " + str(informe["commit"]))
+    for seccion in SECCIONES:
+        if seccion in args.only:
+            print("[" + seccion + "]")
+            MEDIDORES[seccion](args, informe["resultados"])
+
+    if args.out != "":
+        with open(args.out, "w") as f:
+            json.dump(informe, f, indent=1)
+        print("results: " + args.out)
+    if args.compare != "":
+        with open(args.compare, "r") as f:
+            base = json.load(f)
+        if compara(base["resultados"], informe["resultados"], args.tolerance) > 0:
+            sys.exit(1)
+
+def maquina():
+    # lo necesario para saber si dos resultados se pueden comparar
+    return {"sistema": platform.platform(), "procesador": platform.processor() or
+            platform.machine(), "cpus": os.cpu_count() or 1,
+            "python": platform.python_version(), "numpy": np.__version__,
+            "scipy": scipy.__version__}
+
+def commitActual():
+    try:
+        carpeta = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=carpeta,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except:
+        return None
+
+def mejorTiempo(funcion, repite):
+    mejor = np.inf
+    for _ in range(max(1, repite)):
+        t = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor
+
+def anota(resultados, clave, segundos, cantidad, unidad):
+    # cada resultado guarda el mejor tiempo y el ritmo, unidad por segundo
+    ritmo = cantidad / max(1e-12, segundos)
+    resultados[clave] = {"segundos": segundos, "cantidad": cantidad, "unidad": unidad,
+                         "ritmo": ritmo}
+    print("  " + clave.ljust(28) + str(round(segundos * 1000.0, 2)).rjust(11) + " ms" +
+          str(round(ritmo, 1)).rjust(14) + " " + unidad + "/s")
+
+def compara(base, nuevo, tolerancia):
+    # compara el tiempo por unidad, asi no importa si cambio la cantidad
+    regresiones = 0
+    print("[compare]")
+    for clave in sorted(nuevo):
+        if clave not in base:
+            continue
+        razon = base[clave]["ritmo"] / max(1e-12, nuevo[clave]["ritmo"])
+        marca = ""
+        if razon > tolerancia:
+            marca = "  REGRESSION"
+            regresiones += 1
+        print("  " + clave.ljust(28) + str(round(razon, 2)).rjust(8) + "x time" + marca)
+    print("regressions: " + str(regresiones))
+    return regresiones
+
+def patronesSinteticos(filas, clases, rng):
+    # 14 entradas (pitch y 13 MFCC) con escalas parecidas a las reales,
+    # cada clase es una nube alrededor de su propio centro
+    escala = np.concatenate(([200.0], np.full(13, 20.0)))
+    centros = rng.normal(size=(clases, 14)) * escala
+    clase = rng.integers(0, clases, filas)
+    entradas = centros[clase] + rng.normal(size=(filas, 14)) * escala * 0.5
+    return np.column_stack((entradas, clase.astype(float)))
+
+def medirExtraccion(args, resultados):
+    # los audios se llevan a 16 kHz como en la GUI
+    audios = []
+    for f in sorted(os.listdir(args.folder)):
+        if f.lower().endswith(".wav"):
+            voz, Fs = leeAudio(os.path.join(args.folder, f))
+            audios.append(cambiaFrecuencia(voz, Fs, 16000))
+    if len(audios) == 0:
+        print("  no .wav files in " + args.folder)
+        return
+    segundos = sum([voz.size for voz in audios]) / 16000.0
+    print("  files: " + str(len(audios)) + "  audio: " + str(round(segundos, 1)) + " s")
+
+    # la primera corrida de ourMFCC arma el plan, se cuenta aparte
+    t = time.perf_counter()
+    ourMFCC(audios[0], 16000)
+    anota(resultados, "extraction/plan", time.perf_counter() - t, 1, "plans")
+
+    # sacarPitch va con cualquiera de los dos, usa las mismas tramas
+    for nombre, metodo in (("ourMFCC", ourMFCC), ("mfcc", mfcc), ("pitch", sacarPitch)):
+        mejor = mejorTiempo(lambda: [metodo(voz, 16000) for voz in audios], args.repeat)
+        anota(resultados, "extraction/" + nombre, mejor, segundos, "s audio")
+
+    tramas = ourMFCC(audios[0], 16000)
+    tramas = np.column_stack((sacarPitch(audios[0], 16000, 320, 160, np.shape(tramas)[0]),
+                              tramas))
+    tramas = np.tile(tramas, (max(1, 100000 // np.shape(tramas)[0]), 1))
+    mejor = mejorTiempo(lambda: meanTrozos(tramas, 10), args.repeat)
+    anota(resultados, "extraction/meanTrozos", mejor, np.shape(tramas)[0], "frames")
+
+    for nombre, optimo in (("opt", True), ("low", False)):
+        mejor = mejorTiempo(lambda: [extraeRasgos(voz, 16000, 10, optimo) for voz in audios],
+                            args.repeat)
+        anota(resultados, "extraction/extraeRasgos-" + nombre, mejor, segundos, "s audio")
+
+def medirFrecuencia(args, resultados):
+    # ruido blanco, el costo no depende del contenido de la señal
+    for FsOri in (44100, 48000):
+        voz = np.random.default_rng(0).normal(size=int(args.seconds * FsOri))
+        t = time.perf_counter()
+        planFrecuencia.cache_clear()
+        plan = planFrecuencia(FsOri, 16000)
+        print("  " + str(FsOri) + " -> 16000  up/down: " + str(plan.up) + "/" +
+              str(plan.down) + "  taps: " + str(plan.h.size))
+        anota(resultados, "resample/" + str(FsOri) + "-filter", time.perf_counter() - t, 1,
+              "filters")
+
+        def bloques():
+            flujo = FlujoFrecuencia(FsOri, 16000)
+            for n in range(0, voz.size, 2**16):
+                flujo.alimenta(voz[n:(n + 2**16)])
+            flujo.termina()
+
+        def lineal():
+            total = (voz.size - 1) * 16000 // FsOri + 1
+            np.interp(np.arange(total) * FsOri / 16000, np.arange(voz.size), voz)
+
+        for nombre, funcion in (("whole", lambda: cambiaFrecuencia(voz, FsOri, 16000)),
+                                ("blocks", bloques), ("linear", lineal)):
+            mejor = mejorTiempo(funcion, args.repeat)
+            anota(resultados, "resample/" + str(FsOri) + "-" + nombre, mejor, args.seconds,
+                  "s audio")
+
+def medirInicio(args, resultados):
+    patrones = patronesSinteticos(args.rows, args.classes, np.random.default_rng(0))
+    entradas = patrones[:, :-1]
+    mejor = mejorTiempo(lambda: Kmedias(entradas, args.clusters, 20, semilla=0), args.repeat)
+    anota(resultados, "init/Kmedias", mejor, args.rows, "rows")
+    # inicializaDMNN corre Kmedias de cada clase, en uno y en varios procesos
+    for procesos in sorted({1, os.cpu_count() or 1}):
+        mejor = mejorTiempo(lambda: inicializaDMNN(patrones, args.clusters, 20, 10.0,
+                                                   procesos, 0), args.repeat)
+        anota(resultados, "init/inicializaDMNN-p" + str(procesos), mejor, args.rows, "rows")
+    mejor = mejorTiempo(lambda: inicializaDMNNlotes(patrones, args.clusters, 20, 10.0,
+                                                    4096, 0), args.repeat)
+    anota(resultados, "init/inicializaDMNNlotes", mejor, args.rows, "rows")
+
+def redSintetica(args):
+    patrones = patronesSinteticos(args.rows, args.classes, np.random.default_rng(0))
+    pesW, numK = inicializaDMNN(patrones, args.clusters, 20, 10.0, 1, 0)
+    return patrones, pesW, numK
+
+def medirEntrenamiento(args, resultados):
+    patrones, pesW, numK = redSintetica(args)
+    entrena = EntrenaDMNN()
+    entrena.patrones = patrones
+    entrena.pesW, entrena.numK = pesW.copy(), numK
+    entrena.muta = np.max(patrones[:, :-1]) * 0.01
+    # funError es lo que cuesta una iteracion del modo genetic
+    mejor = mejorTiempo(lambda: entrena.funError(entrena.pesW), args.repeat)
+    anota(resultados, "train/funError", mejor, 1, "calls")
+    for modo, cuantas in (("genetic", 20), ("delta", 200), ("boxes", 5)):
+        np.random.seed(0)
+        entrena.modo = modo
+        entrena.pesW, entrena.numK, entrena.cajas, entrena.pasos = pesW.copy(), numK, None, None
+        entrena.Smk, entrena.Zm = None, None
+        entrena.error = np.array([0, entrena.funError(entrena.pesW)], dtype=float)
+        entrena.iteracion = [0, cuantas]
+        t = time.perf_counter()
+        entrena.iterar(cuantas)
+        anota(resultados, "train/iterar-" + modo, time.perf_counter() - t, cuantas,
+              "iterations")
+
+def medirInferencia(args, resultados):
+    patrones, pesW, numK = redSintetica(args)
+    entradas = patrones[:, :-1]
+    # ExecuteDMNN fila por fila, es lento, con pocas filas basta
+    pocas = entradas[:min(500, args.rows)]
+    mejor = mejorTiempo(lambda: [ExecuteDMNN(x, pesW, numK, True) for x in pocas], args.repeat)
+    anota(resultados, "test/ExecuteDMNN", mejor, np.shape(pocas)[0], "rows")
+    # lo mismo con el modelo armado una vez, como en el live
+    modelo = ModeloDMNN(pesW, numK)
+    mejor = mejorTiempo(lambda: [ExecuteDMNN(x, modelo, numK, True) for x in pocas], args.repeat)
+    anota(resultados, "test/ExecuteDMNN-modelo", mejor, np.shape(pocas)[0], "rows")
+    mejor = mejorTiempo(lambda: batchExecuteDMNN(entradas, pesW, numK, True), args.repeat)
+    anota(resultados, "test/batchExecuteDMNN", mejor, args.rows, "rows")
+    mejor = mejorTiempo(lambda: multiExecuteDMNN(entradas[:, 1:], entradas[:, 0], pesW, numK),
+                        args.repeat)
+    anota(resultados, "test/multiExecuteDMNN", mejor, args.rows, "rows")
+
+SECCIONES = ["extraction", "resample", "init", "train", "test"]
+MEDIDORES = {"extraction": medirExtraccion, "resample": medirFrecuencia, "init": medirInicio,
+             "train": medirEntrenamiento, "test": medirInferencia}
+
+# instanciar el software
+if __name__ == "__main__":
+    main()
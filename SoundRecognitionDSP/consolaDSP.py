@@ -0,0 +1,275 @@
+# Proyecto Reconocimiento de Sonido por DSP UV 2020
+# Consola sin GUI, corre los mismos algoritmos que los hilos de la GUI,
+# sirve para trabajos por lotes en servidores sin pantalla, ejemplo:
+#   python consolaDSP.py extract audio.wav --patterns pat.txt --method low
+#   python consolaDSP.py corpus ../audiosVarios --patterns pat.txt
+#   python consolaDSP.py init --patterns pat.txt --net red.txt
+#   python consolaDSP.py train --patterns pat.txt --net red.txt --mode delta
+#   python consolaDSP.py accuracy --patterns pat.txt --net red.txt
+#   python consolaDSP.py test audio.wav --patterns pat.txt --net red.txt
+#   python consolaDSP.py live --patterns pat.txt --net red.txt --rate 10
+#   python consolaDSP.py convert pat.txt pat.pdsp
+#   python consolaDSP.py convert-net red.txt red.rdsp
+#   python consolaDSP.py --trace traza.json test audio.wav --net red.txt
+
+import os
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from nucleoDSP import EntrenaDMNN, leePatrones,\
+    escribePatrones, leeModelo, escribeRed, extraeArchivo, bloquePatrones, probarArchivo,\
+    matrizConfusion, metricasConfusion, inicializaDMNN, inicializaDMNNlotes, nombreClase,\
+    extraeCorpus, EscuchaDMNN, esBinario, agregaPatronesBin, FIRMA_PATRONES, Medidor
+
+# la funcion principal o inicializadora
+def main(argv=None):
+    args = argumentos().parse_args(argv)
+    if args.trace == "":
+        args.comando(args)
+        return
+    # mide las etapas del comando y las guarda aunque se corte con Ctrl+C
+    inicio = time.perf_counter()
+    try:
+        with Medidor(not args.no_memory) as medidor:
+            args.comando(args)
+    finally:
+        traza = {"comando": args.nombre, "segundos": time.perf_counter() - inicio,
+                 "parametros": {k: v for k, v in vars(args).items() if k != "comando"},
+                 "etapas": medidor.resumen()}
+        with open(args.trace, "w") as f:
+            json.dump(traza, f, indent=1)
+
+def argumentos():
+    parser = argparse.ArgumentParser(prog="consolaDSP",
+                                     description="Sound Recognition DSP without GUI")
+    parser.add_argument("--trace", default="",
+                        help="JSON file with time, calls and peak memory of each stage")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="trace without peak memory, tracemalloc slows the python code")
+    sub = parser.add_subparsers(required=True, dest="nombre")
+
+    aux = sub.add_parser("extract", help="extract features of an audio to a patterns file")
+    aux.add_argument("audio")
+    aux.add_argument("--patterns", required=True, help="patterns file, created if missing")
+    aux.add_argument("--name", default="", help="class name, default letters of file name")
+    aux.add_argument("--method", choices=["opt", "low"], default="opt")
+    aux.add_argument("--partition", type=int, default=10)
+    aux.set_defaults(comando=comandoExtract)
+
+    aux = sub.add_parser("corpus", help="extract all the .wav of a folder to one patterns file")
+    aux.add_argument("folder")
+    aux.add_argument("--patterns", required=True, help="output patterns file")
+    aux.add_argument("--method", choices=["opt", "low"], default="opt")
+    aux.add_argument("--partition", type=int, default=10)
+    aux.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    aux.set_defaults(comando=comandoCorpus)
+
+    aux = sub.add_parser("init", help="create a new DMNN from patterns")
+    aux.add_argument("--patterns", required=True)
+    aux.add_argument("--net", required=True, help="output net file")
+    aux.add_argument("--clusters", type=int, default=10)
+    aux.add_argument("--iterations", type=int, default=100)
+    aux.add_argument("--box", type=float, default=10.0, help="hiper-box size %%")
+    aux.add_argument("--batch", type=int, default=0,
+                     help="rows per mini-batch, 0 uses full K-means")
+    aux.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    aux.add_argument("--seed", type=int, default=None)
+    aux.add_argument("--method", choices=["opt", "low"], default=None,
+                     help="extraction method of the patterns, saved in the net")
+    aux.add_argument("--partition", type=int, default=None,
+                     help="partition of the patterns, saved in the net")
+    aux.set_defaults(comando=comandoInit)
+
+    aux = sub.add_parser("train", help="train a DMNN, overwrite the net file")
+    aux.add_argument("--patterns", required=True)
+    aux.add_argument("--net", required=True)
+    aux.add_argument("--mutation", type=float, default=1.0, help="mutation %%")
+    aux.add_argument("--iterations", type=int, default=100)
+    aux.add_argument("--mode", choices=["genetic", "delta", "population", "boxes"], default="genetic")
+    aux.add_argument("--every", type=float, default=1.0, help="seconds between progress lines")
+    aux.add_argument("--fixed-step", action="store_true",
+                     help="same mutation for all the weights, without adapting it")
+    aux.add_argument("--patience", type=int, default=0,
+                     help="stop after these iterations without improving, 0 auto, -1 never")
+    aux.add_argument("--target", type=float, nargs="*", default=[],
+                     help="errors to log the iteration and seconds where they are reached")
+    aux.set_defaults(comando=comandoTrain)
+
+    aux = sub.add_parser("accuracy", help="performance metrics of a net for patterns")
+    aux.add_argument("--patterns", required=True)
+    aux.add_argument("--net", required=True)
+    aux.set_defaults(comando=comandoAccuracy)
+
+    aux = sub.add_parser("test", help="classify an audio with a net")
+    aux.add_argument("audio")
+    aux.add_argument("--net", required=True)
+    aux.add_argument("--patterns", default="", help="patterns file, for the class names")
+    aux.add_argument("--method", choices=["opt", "low"], default=None,
+                     help="default the one saved in the net, else opt")
+    aux.add_argument("--partition", type=int, default=None,
+                     help="default the one saved in the net, else 10")
+    aux.set_defaults(comando=comandoTest)
+
+    aux = sub.add_parser("live", help="classify the microphone continuously, Ctrl+C to end")
+    aux.add_argument("--net", required=True)
+    aux.add_argument("--patterns", default="", help="patterns file, for the class names")
+    aux.add_argument("--partition", type=int, default=None,
+                     help="default the one saved in the net, else 10")
+    aux.add_argument("--window", type=float, default=1.0, help="seconds of audio per decision")
+    aux.add_argument("--rate", type=float, default=10.0, help="decisions per second")
+    aux.add_argument("--method", choices=["opt", "low"], default=None,
+                     help="default the one saved in the net, else opt")
+    aux.set_defaults(comando=comandoLive)
+
+    aux = sub.add_parser("convert", help="convert a patterns file between text and binary")
+    aux.add_argument("source")
+    aux.add_argument("destination", help=".txt is written as text, other extension as binary")
+    aux.set_defaults(comando=comandoConvert)
+
+    aux = sub.add_parser("convert-net", help="convert a net file between text and binary")
+    aux.add_argument("source")
+    aux.add_argument("destination", help=".txt is written as text, other extension as binary")
+    aux.set_defaults(comando=comandoConvertNet)
+    return parser
+
+def tituloArchivo(ruta):
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+def abrirModelo(args):
+    # la red trae metodo, particion y nombres, los argumentos los reemplazan
+    modelo = leeModelo(args.net, True)
+    if args.method is None:
+        args.method = modelo["metodo"] or "opt"
+    if args.partition is None:
+        args.partition = modelo["particion"] or 10
+    names = leePatrones(args.patterns)[1] if args.patterns else modelo["salidas"]
+    return modelo["pesW"], modelo["numK"], names
+
+def comandoExtract(args):
+    nombre = args.name
+    if nombre == "":
+        nombre = nombreClase(args.audio)
+    if os.path.exists(args.patterns):
+        titulo, names, patrones = leePatrones(args.patterns, True)
+    else:
+        titulo = tituloArchivo(args.patterns)
+        names, patrones = [], np.zeros((0, 15), dtype=float)
+    if nombre not in names:
+        names.append(nombre)
+    # por bloques y a 16 kHz como la GUI, sirve para grabaciones de horas
+    param, tono = extraeArchivo(args.audio, args.partition, args.method == "opt")
+    bloque = bloquePatrones(param, tono, names.index(nombre))
+    if os.path.exists(args.patterns) and esBinario(args.patterns, FIRMA_PATRONES):
+        # el binario solo agrega las filas nuevas al final
+        total = agregaPatronesBin(args.patterns, names, bloque)
+    else:
+        patrones = np.concatenate((patrones, bloque), axis=0)
+        escribePatrones(args.patterns, titulo, names, patrones)
+        total = np.shape(patrones)[0]
+    print(nombre + ": " + str(np.shape(bloque)[0]) + " patterns, total " + str(total))
+
+def comandoCorpus(args):
+    def avance(hechos, total):
+        print("\rfiles: " + str(hechos) + " / " + str(total), end="", flush=True)
+    names, patrones, velocidad = extraeCorpus(args.folder, args.partition,
+                                              args.method == "opt", args.processes,
+                                              avance=avance)
+    escribePatrones(args.patterns, tituloArchivo(args.patterns), names, patrones)
+    print("\nclasses: " + str(len(names)) + "  patterns: " + str(np.shape(patrones)[0]) +
+          "  files/s: " + str(round(velocidad, 2)))
+
+def comandoInit(args):
+    _, names, patrones = leePatrones(args.patterns, True)
+    if args.batch > 0:
+        pesW, numK = inicializaDMNNlotes(patrones, args.clusters, args.iterations, args.box,
+                                         args.batch, args.seed)
+    else:
+        pesW, numK = inicializaDMNN(patrones, args.clusters, args.iterations, args.box,
+                                    args.processes, args.seed)
+    escribeRed(args.net, pesW, numK, names, args.method, args.partition)
+    print("W: " + str(pesW.size))
+
+def comandoTrain(args):
+    _, names, patrones = leePatrones(args.patterns, True)
+    entrena = EntrenaDMNN()
+    entrena.patrones = patrones
+    modelo = leeModelo(args.net)
+    entrena.pesW, entrena.numK = modelo["pesW"], modelo["numK"]
+    entrena.muta = np.max(patrones[:, :-1]) * args.mutation / 100.0
+    entrena.iteracion = [0, max(1, args.iterations)]
+    entrena.modo = args.mode
+    entrena.adapta = not args.fixed_step
+    entrena.paciencia = args.patience
+    entrena.metas = args.target
+    entrena.error = np.array([0, entrena.funError(entrena.pesW)], dtype=float)
+    def avance(entrena):
+        print("Go%: " + str(int(100.0 * entrena.iteracion[0] / entrena.iteracion[1])) +
+              "  error: " + str(round(entrena.error[-1], 4)) +
+              "  It/s: " + str(round(entrena.velocidad, 1)))
+    entrena.entrena(avance, periodo=args.every)
+    print("stop: " + entrena.parada)
+    if entrena.estancado:
+        print("stall: no improvement since iteration " + str(entrena.mejora))
+    for meta in args.target:
+        if meta in entrena.alcanzadas:
+            iteracion, segundos = entrena.alcanzadas[meta]
+            print("target " + str(meta) + ": iteration " + str(iteracion) +
+                  "  seconds " + str(round(segundos, 2)))
+        else:
+            print("target " + str(meta) + ": not reached")
+    escribeRed(args.net, entrena.pesW, entrena.numK, names or modelo["salidas"],
+               modelo["metodo"], modelo["particion"])
+
+def comandoAccuracy(args):
+    _, names, patrones = leePatrones(args.patterns, True)
+    modelo = leeModelo(args.net, True)
+    pesW, numK = modelo["pesW"], modelo["numK"]
+    matrix = matrizConfusion(patrones, pesW, numK)
+    exacti, sensi, acc = metricasConfusion(matrix)
+    print("Class Name".ljust(14) + "Pre%".rjust(6) + "Sen%".rjust(6))
+    for i in range(exacti.size):
+        nombre = names[i] if i < len(names) else "Class" + str(i)
+        print(nombre.ljust(14) + str(int(exacti[i] * 100.0)).rjust(6) +
+              str(int(sensi[i] * 100.0)).rjust(6))
+    print("Acc%: " + str(round(acc * 100.0, 2)))
+
+def comandoConvert(args):
+    titulo, names, patrones = leePatrones(args.source, True)
+    escribePatrones(args.destination, titulo, names, patrones)
+    print(args.destination + ": " + str(np.shape(patrones)[0]) + " patterns")
+
+def comandoConvertNet(args):
+    modelo = leeModelo(args.source, True)
+    escribeRed(args.destination, modelo["pesW"], modelo["numK"], modelo["salidas"],
+               modelo["metodo"], modelo["particion"])
+    print(args.destination + ": " + str(modelo["pesW"].size) + " weights")
+
+def comandoTest(args):
+    pesW, numK, names = abrirModelo(args)
+    prediction = probarArchivo(args.audio, pesW, numK, args.partition, args.method == "opt")
+    winner = np.argmax(prediction)
+    for i in range(prediction.size):
+        nombre = names[i] if i < len(names) else "Class" + str(i)
+        marca = " <" if i == winner else ""
+        print(nombre.ljust(14) + str(int(prediction[i] * 100.0)).rjust(6) + marca)
+
+def comandoLive(args):
+    pesW, numK, names = abrirModelo(args)
+    escucha = EscuchaDMNN(pesW, numK, 16000, args.partition, args.window,
+                          1.0 / max(0.01, args.rate), args.method == "opt")
+    def emite(prediction, latencia):
+        winner = int(np.argmax(prediction))
+        nombre = names[winner] if winner < len(names) else "Class" + str(winner)
+        print("\r" + nombre.ljust(14) + str(int(prediction[winner] * 100.0)).rjust(4) +
+              "%  latency: " + str(int(latencia * 1000.0)).rjust(4) + " ms", end="", flush=True)
+    try:
+        escucha.corre(emite)
+    except KeyboardInterrupt:
+        print("")
+
+# instanciar el software
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,1812 @@
+# Proyecto Reconocimiento de Sonido por DSP UV 2020
+# Nucleo sin GUI: extraccion de rasgos, red DMNN, inicializacion,
+# entrenamiento y archivos, lo usan la GUI y la consola (consolaDSP.py)
+
+import os
+import time
+import json
+import threading
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from functools import lru_cache
+from contextlib import contextmanager
+from numpy.fft import rfft, irfft
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fftpack import dct
+from scipy.signal import firwin, resample_poly
+from python_speech_features import mfcc
+import soundfile as sf
+
+# nombres de las 14 entradas de la red, 1 de pitch y 13 de MFCC
+ENTRADAS = ["Pitch"] + ["n" + str(i) for i in range(13)]
+
+# archivos binarios: 8 bytes de firma, cabecera JSON de tamaño fijo
+# rellena con espacios y luego la matriz contigua, que se abre con memmap
+FIRMA_PATRONES = b"DSPPAT01"
+FIRMA_RED = b"DSPRED01"
+CABECERA = 4096
+
+# medicion de etapas
+
+# el medidor activo de cada hilo, las funciones del nucleo marcan sus etapas
+# con etapa(nombre) y sin medidor activo no se mide nada
+medicion = threading.local()
+# tracemalloc es uno solo para todos los hilos: lo arranca el primer medidor
+# con memoria y lo para el ultimo que sale (si no estaba ya arrancado); con
+# varios trabajos a la vez el pico de uno incluye lo que reservan los otros
+memoriaMedida = {"cuantos": 0, "propio": False, "candado": threading.Lock()}
+
+class Medidor:
+    # acumula por etapa el tiempo de pared, las llamadas y el pico de memoria
+    # sobre lo que habia al entrar (tracemalloc, que hace mas lento el codigo
+    # con muchos objetos de python), se activa con with en el hilo que mide
+
+    def __init__(self, memoria=True):
+        self.memoria = memoria
+        self.etapas = {}
+        self.pila = []
+
+    def __enter__(self):
+        medicion.medidor = self
+        if self.memoria:
+            with memoriaMedida["candado"]:
+                if memoriaMedida["cuantos"] == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    memoriaMedida["propio"] = True
+                memoriaMedida["cuantos"] += 1
+        return self
+
+    def __exit__(self, *error):
+        medicion.medidor = None
+        if self.memoria:
+            with memoriaMedida["candado"]:
+                memoriaMedida["cuantos"] -= 1
+                if memoriaMedida["cuantos"] == 0 and memoriaMedida["propio"]:
+                    tracemalloc.stop()
+                    memoriaMedida["propio"] = False
+
+    def entra(self, nombre):
+        base = 0
+        if self.memoria and tracemalloc.is_tracing():
+            # el pico se reinicia por etapa, el de la etapa de afuera se guarda
+            base, pico = tracemalloc.get_traced_memory()
+            if len(self.pila) > 0:
+                self.pila[-1][3] = max(self.pila[-1][3], pico)
+            tracemalloc.reset_peak()
+        self.pila.append([nombre, time.perf_counter(), base, base])
+
+    def sale(self):
+        nombre, inicio, base, pico = self.pila.pop()
+        segundos = time.perf_counter() - inicio
+        if self.memoria and tracemalloc.is_tracing():
+            pico = max(pico, tracemalloc.get_traced_memory()[1])
+            if len(self.pila) > 0:
+                self.pila[-1][3] = max(self.pila[-1][3], pico)
+        dato = self.etapas.setdefault(nombre, {"llamadas": 0, "segundos": 0.0, "pico": 0})
+        dato["llamadas"] += 1
+        dato["segundos"] += segundos
+        dato["pico"] = max(dato["pico"], pico - base)
+
+    def resumen(self):
+        # lista de etapas de la mas lenta a la mas rapida, pico en bytes
+        return [dict(etapa=nombre, **dato) for nombre, dato in
+                sorted(self.etapas.items(), key=lambda e: -e[1]["segundos"])]
+
+    def texto(self):
+        txt = "Stage".ljust(10) + "Calls".rjust(8) + "ms".rjust(10) + "MB".rjust(8)
+        for dato in self.resumen():
+            txt += "\n" + dato["etapa"].ljust(10) + str(dato["llamadas"]).rjust(8) + \
+                   str(round(dato["segundos"] * 1000.0, 1)).rjust(10) + \
+                   str(round(dato["pico"] / 2.0 ** 20, 1)).rjust(8)
+        return txt
+
+@contextmanager
+def etapa(nombre):
+    medidor = getattr(medicion, "medidor", None)
+    if medidor is None:
+        yield
+        return
+    medidor.entra(nombre)
+    try:
+        yield
+    finally:
+        medidor.sale()
+
+# funciones de archivos
+
+def leeAudio(ruta):
+    with etapa("decode"):
+        voz, Fs = sf.read(ruta)
+    try:
+        voz = voz[:, 0]
+    except:
+        pass
+    return voz, Fs
+
+def nombreClase(ruta):
+    # la clase es la parte alfabetica del nombre del archivo
+    titulo = os.path.basename(ruta).replace(".wav", "")
+    return "".join(k for k in titulo if k.isalpha())
+
+def cambiaFrecuencia(voz, FsOri, Fs):
+    # remuestreo polifasico (up / down) con el filtro en cache, da lo mismo
+    # que FlujoFrecuencia por bloques
+    if Fs != FsOri:
+        with etapa("resample"):
+            voz = planFrecuencia(int(FsOri), int(Fs)).remuestrea(voz)
+    return voz
+
+@lru_cache(maxsize=16)
+def planFrecuencia(FsOri, Fs):
+    # un filtro por par de frecuencias, se diseña una sola vez
+    return PlanFrecuencia(FsOri, Fs)
+
+class PlanFrecuencia:
+    # filtro FIR pasa bajas (kaiser, como resample_poly por defecto), la
+    # salida m sale de las entradas i con m * down + medio - i * up dentro
+    # del filtro, o sea desde primera(m) hacia atras taps muestras
+
+    def __init__(self, FsOri, Fs):
+        g = np.gcd(FsOri, Fs)
+        self.up = Fs // g
+        self.down = FsOri // g
+        self.medio = 10 * max(self.up, self.down)
+        self.h = firwin(2 * self.medio + 1, 1.0 / max(self.up, self.down),
+                        window=("kaiser", 5.0))
+        self.taps = int(np.ceil(self.h.size / self.up))
+
+    def remuestrea(self, voz):
+        return resample_poly(voz, self.up, self.down, window=self.h)
+
+    def salidas(self, muestras):
+        # cuantas muestras salen de una señal de entrada completa
+        return -(-muestras * self.up // self.down)
+
+    def disponibles(self, muestras):
+        # cuantas salidas ya tienen todas sus entradas
+        return max(0, -(-(muestras * self.up - self.medio) // self.down))
+
+    def primera(self, m):
+        return (m * self.down + self.medio) // self.up
+
+class FlujoFrecuencia:
+    # cambiaFrecuencia por bloques: la cola empieza en un multiplo de down,
+    # asi resample_poly de la cola da las mismas salidas que la señal
+    # entera, solo se guardan las entradas que aun usan las que faltan
+
+    def __init__(self, FsOri, Fs):
+        self.igual = int(FsOri) == int(Fs)
+        if not self.igual:
+            self.plan = planFrecuencia(int(FsOri), int(Fs))
+        self.cola = np.zeros(0, dtype=float)
+        self.base = 0
+        self.total = 0
+        self.hechas = 0
+
+    def alimenta(self, muestras):
+        if self.igual:
+            return muestras
+        self.total += muestras.size
+        self.cola = np.concatenate((self.cola, muestras))
+        return self.saca(self.plan.disponibles(self.total))
+
+    def termina(self):
+        if self.igual:
+            return np.zeros(0, dtype=float)
+        return self.saca(self.plan.salidas(self.total))
+
+    def saca(self, hasta):
+        if hasta <= self.hechas:
+            return np.zeros(0, dtype=float)
+        inicio = self.base * self.plan.up // self.plan.down
+        with etapa("resample"):
+            salida = self.plan.remuestrea(self.cola)[(self.hechas - inicio):(hasta - inicio)]
+        self.hechas = hasta
+        corte = self.plan.primera(self.hechas) - self.plan.taps - self.base
+        corte = max(0, corte // self.plan.down) * self.plan.down
+        self.cola = self.cola[corte:]
+        self.base += corte
+        return salida
+
+class FuenteAudio:
+    # un wav que se lee por bloques con soundfile sin cargarlo entero,
+    # igual que leeAudio solo usa el primer canal
+
+    def __init__(self, ruta, bloque=2**16):
+        info = sf.info(ruta)
+        self.ruta = ruta
+        self.Fs = info.samplerate
+        self.muestras = info.frames
+        self.duracion = info.frames / info.samplerate
+        self.bloque = bloque
+
+    def bloques(self, bloque=None):
+        lector = sf.blocks(self.ruta, blocksize=bloque or self.bloque, dtype="float64",
+                           always_2d=True)
+        while True:
+            with etapa("decode"):
+                datos = next(lector, None)
+            if datos is None:
+                return
+            yield datos[:, 0]
+
+    def envolvente(self, paso):
+        # minimo y maximo de cada grupo de paso muestras, leyendo por bloques
+        minimo, maximo = [], []
+        for datos in self.bloques(paso * max(1, self.bloque // paso)):
+            inicio = np.arange(0, datos.size, paso)
+            minimo.append(np.minimum.reduceat(datos, inicio).astype(np.float32))
+            maximo.append(np.maximum.reduceat(datos, inicio).astype(np.float32))
+        if len(minimo) == 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(minimo), np.concatenate(maximo)
+
+class PiramideAudio:
+    # envolventes min/max de la señal en niveles, cada uno con factor veces
+    # menos grupos que el anterior; ventana() toma el nivel mas fino que da
+    # a lo sumo puntos grupos en el rango visible, asi graficar no depende
+    # del largo del audio y los picos no se pierden al diezmar
+
+    def __init__(self, minimo, maximo, paso, Fs, muestras, factor=8):
+        self.Fs = Fs
+        self.muestras = muestras
+        self.niveles = [(paso, minimo, maximo)]
+        while minimo.size > 1:
+            inicio = np.arange(0, minimo.size, factor)
+            minimo = np.minimum.reduceat(minimo, inicio).astype(np.float32)
+            maximo = np.maximum.reduceat(maximo, inicio).astype(np.float32)
+            paso *= factor
+            self.niveles.append((paso, minimo, maximo))
+        if muestras > 0:
+            self.limites = (float(minimo[0]), float(maximo[0]))
+        else:
+            self.limites = (-1.0, 1.0)
+
+    @classmethod
+    def desdeVoz(cls, voz, Fs):
+        # el primer nivel es la misma señal, sin copiarla
+        return cls(voz, voz, 1, Fs, voz.size)
+
+    @classmethod
+    def desdeFuente(cls, fuente, grupos=2**20):
+        # audio largo sin cargar: el primer nivel ya viene agrupado
+        paso = max(1, int(np.ceil(fuente.muestras / grupos)))
+        minimo, maximo = fuente.envolvente(paso)
+        return cls(minimo, maximo, paso, fuente.Fs, fuente.muestras)
+
+    def duracion(self):
+        return self.muestras / self.Fs
+
+    def ventana(self, t0, t1, puntos=2000):
+        # devuelve tiempos y valores a graficar entre t0 y t1 segundos, cada
+        # grupo aporta su minimo y su maximo en el mismo instante
+        a = min(max(int(t0 * self.Fs), 0), self.muestras)
+        b = min(max(int(np.ceil(t1 * self.Fs)), a + 1), self.muestras)
+        for paso, minimo, maximo in self.niveles:
+            if (b - a) / paso <= puntos:
+                break
+        i0, i1 = a // paso, -(-b // paso)
+        if paso == 1:
+            return np.arange(i0, i1) / self.Fs, np.asarray(minimo[i0:i1], dtype=float)
+        tiempo = np.repeat(np.arange(i0, i1) * paso / self.Fs, 2)
+        valores = np.column_stack((minimo[i0:i1], maximo[i0:i1])).ravel()
+        return tiempo, valores.astype(float)
+
+def leePatrones(ruta, memoria=False):
+    # devuelve titulo, nombres de clases y matriz de patrones, el formato
+    # se reconoce por la firma, memoria=True deja el binario en memmap
+    if esBinario(ruta, FIRMA_PATRONES):
+        return leePatronesBin(ruta, memoria)
+    file = open(ruta, "r")
+    txt = file.read().split("\n")
+    file.close()
+    if txt[0].find("Patrones: ") != 0 or txt[1].find("Salidas: ") != 0 or\
+            txt[2].find("Entradas: ") != 0:
+        raise ValueError("invalid format...")
+    titulo = txt[0][10:]
+    names = [n for n in txt[1][9:].split(", ") if n != ""]
+    patrones = [list(map(float, t.split(", ")[:15])) for t in txt[3:] if t != ""]
+    patrones = np.array(patrones, dtype=float).reshape(-1, 15)
+    return titulo, names, patrones
+
+def escribePatrones(ruta, titulo, names, patrones):
+    # la extension decide el formato, texto para .txt y binario si no
+    if not ruta.lower().endswith(".txt"):
+        escribePatronesBin(ruta, titulo, names, patrones)
+        return
+    file = open(ruta, "w")
+    try:
+        file.write("Patrones: " + titulo + "\n")
+        file.write("Salidas: " + ", ".join(names) + "\n")
+        file.write("Entradas: " + ", ".join(ENTRADAS) + "\n")
+        # escribir los datos como tal, una linea por patron
+        for fila in np.asarray(patrones, dtype=float).reshape(-1, 15).tolist():
+            file.write(", ".join(map(str, fila)) + "\n")
+    finally:
+        file.close()
+
+def esBinario(ruta, firma):
+    file = open(ruta, "rb")
+    try:
+        return file.read(len(firma)) == firma
+    finally:
+        file.close()
+
+def escribeCabecera(file, firma, cabecera):
+    file.seek(0)
+    file.write(armaCabecera(firma, cabecera))
+
+def armaCabecera(firma, cabecera):
+    # siempre ocupa CABECERA bytes, asi se puede reescribir al agregar datos
+    txt = json.dumps(cabecera).encode("utf-8")
+    if len(firma) + len(txt) > CABECERA:
+        raise ValueError("header too big...")
+    return firma + txt + b" " * (CABECERA - len(firma) - len(txt))
+
+def leeCabecera(ruta, firma):
+    file = open(ruta, "rb")
+    try:
+        txt = file.read(CABECERA)
+    finally:
+        file.close()
+    if len(txt) != CABECERA or txt[:len(firma)] != firma:
+        raise ValueError("invalid format...")
+    return json.loads(txt[len(firma):].decode("utf-8"))
+
+def leePatronesBin(ruta, memoria=True):
+    cabecera = leeCabecera(ruta, FIRMA_PATRONES)
+    forma = (cabecera["filas"], len(cabecera["entradas"]) + 1)
+    if forma[0] == 0:
+        patrones = np.zeros(forma, dtype=cabecera["dtype"])
+    else:
+        patrones = np.memmap(ruta, dtype=cabecera["dtype"], mode="r", offset=CABECERA,
+                             shape=forma)
+        if not memoria:
+            patrones = np.array(patrones)
+    return cabecera["titulo"], cabecera["salidas"], patrones
+
+def escribePatronesBin(ruta, titulo, names, patrones, dtype="float64"):
+    patrones = np.ascontiguousarray(patrones, dtype=dtype).reshape(-1, len(ENTRADAS) + 1)
+    cabecera = {"titulo": titulo, "salidas": list(names), "entradas": ENTRADAS,
+                "dtype": np.dtype(dtype).name, "filas": int(np.shape(patrones)[0])}
+    file = open(ruta, "wb")
+    try:
+        escribeCabecera(file, FIRMA_PATRONES, cabecera)
+        patrones.tofile(file)
+    finally:
+        file.close()
+
+def agregaPatronesBin(ruta, names, bloque):
+    # agrega filas al final sin leer las anteriores, names reemplaza a
+    # los nombres guardados (puede traer clases nuevas)
+    cabecera = leeCabecera(ruta, FIRMA_PATRONES)
+    bloque = np.ascontiguousarray(bloque, dtype=cabecera["dtype"])
+    bloque = bloque.reshape(-1, len(cabecera["entradas"]) + 1)
+    cabecera["salidas"] = list(names)
+    filas = cabecera["filas"]
+    cabecera["filas"] += int(np.shape(bloque)[0])
+    # la cabecera nueva se arma (y se valida) antes de tocar el archivo,
+    # si no cabe no quedan filas que la cabecera vieja no cuenta
+    txt = armaCabecera(FIRMA_PATRONES, cabecera)
+    file = open(ruta, "r+b")
+    try:
+        file.seek(CABECERA + filas * bloque.itemsize * np.shape(bloque)[1])
+        bloque.tofile(file)
+        file.truncate()
+        file.seek(0)
+        file.write(txt)
+    finally:
+        file.close()
+    return cabecera["filas"]
+
+def leeRed(ruta, memoria=False):
+    modelo = leeModelo(ruta, memoria)
+    return modelo["pesW"], modelo["numK"]
+
+def leeModelo(ruta, memoria=False):
+    # devuelve un dict con pesW, numK, salidas, entradas, metodo y particion,
+    # en el formato de texto metodo y particion no existen y quedan None
+    if esBinario(ruta, FIRMA_RED):
+        return leeModeloBin(ruta, memoria)
+    file = open(ruta, "r")
+    txt = file.read().split("\n")
+    file.close()
+    if txt[0].find("DMNN: ") != 0:
+        raise ValueError("invalid format...")
+    modelo = {"pesW": np.array(txt[4].split(","), dtype=float),
+              "numK": np.array(txt[6].split(","), dtype=int),
+              "salidas": [], "entradas": ENTRADAS, "metodo": None, "particion": None}
+    for t in txt[7:]:
+        if t.find("NombresSalidas: ") == 0:
+            modelo["salidas"] = [n for n in t[16:].split(", ") if n != ""]
+        elif t.find("NombresEntradas: ") == 0:
+            modelo["entradas"] = [n for n in t[17:].split(", ") if n != ""]
+    return modelo
+
+def leeModeloBin(ruta, memoria=False):
+    # pesW y numK quedan en memmap, abrir una red grande no la lee entera
+    cabecera = leeCabecera(ruta, FIRMA_RED)
+    pesW = np.memmap(ruta, dtype=cabecera["dtype"], mode="r", offset=CABECERA,
+                     shape=(cabecera["pesos"],))
+    numK = np.memmap(ruta, dtype="int64", mode="r", offset=CABECERA + pesW.nbytes,
+                     shape=(cabecera["clases"],))
+    if not memoria:
+        pesW, numK = np.array(pesW, dtype=float), np.array(numK, dtype=int)
+    return {"pesW": pesW, "numK": numK, "salidas": cabecera["salidas"],
+            "entradas": cabecera["entradas"], "metodo": cabecera["metodo"],
+            "particion": cabecera["particion"]}
+
+def escribeRed(ruta, pesW, numK, names=None, metodo=None, particion=None):
+    # la extension decide el formato, texto para .txt y binario si no,
+    # names son los nombres de las clases, metodo "opt" o "low" y particion
+    # son los de la extraccion con que se hicieron los patrones
+    names = list(names or [])[:numK.size]
+    names += ["Class" + str(i) for i in range(len(names), numK.size)]
+    if not ruta.lower().endswith(".txt"):
+        escribeRedBin(ruta, pesW, numK, names, metodo, particion)
+        return
+    # crear el archivo y escribir las cabeceras
+    file = open(ruta, "w")
+    try:
+        file.write("DMNN: SoundRecognitionDSP\n")
+        file.write("Dimension: Entradas, Clases\n")
+        file.write(str(len(ENTRADAS)) + "," + str(numK.size) + "\n")
+        file.write("Pesos\n")
+        file.write(",".join(map(str, np.asarray(pesW, dtype=float).tolist())) + "\n")
+        file.write("DendritasPorClase\n")
+        file.write(",".join(map(str, np.asarray(numK, dtype=int).tolist())) + "\n")
+        file.write("Activas\n")
+        file.write(",".join(["1"] * int(numK.sum())) + "\n")
+        file.write("NormalizacionH\n")
+        file.write(",".join(["1."] * len(ENTRADAS)) + "\n")
+        file.write("NormalizacionL\n")
+        file.write(",".join(["-1."] * len(ENTRADAS)) + "\n")
+        file.write("NormalizacionN: 0.0\n")
+        file.write("NombresSalidas: " + ", ".join(names) + "\n")
+        file.write("NombresEntradas: " + ", ".join(ENTRADAS) + "\n")
+    finally:
+        file.close()
+
+def escribeRedBin(ruta, pesW, numK, names, metodo=None, particion=None):
+    pesW = np.ascontiguousarray(pesW, dtype="float64")
+    numK = np.ascontiguousarray(numK, dtype="int64")
+    cabecera = {"salidas": list(names), "entradas": ENTRADAS, "metodo": metodo,
+                "particion": None if particion is None else int(particion),
+                "dtype": "float64", "pesos": int(pesW.size), "clases": int(numK.size)}
+    file = open(ruta, "wb")
+    try:
+        escribeCabecera(file, FIRMA_RED, cabecera)
+        pesW.tofile(file)
+        numK.tofile(file)
+    finally:
+        file.close()
+
+# funciones de extraccion y prueba, lo que hacen los hilos de la GUI
+
+def extraeRasgos(voz, Fs, particion, optimo):
+    # optimo usa mfcc de python_speech_features, sino ourMFCC; el pitch sale
+    # de las mismas tramas y se agrupa junto con los MFCC, tono es un vector
+    with etapa("mfcc"):
+        if optimo:
+            tramas = mfcc(voz, Fs)
+            largo = int(round(0.025 * Fs))
+        else:
+            tramas = ourMFCC(voz, Fs)
+            largo = int(round(0.02 * Fs))
+    tonos = sacarPitch(voz, Fs, largo, int(round(0.01 * Fs)), np.shape(tramas)[0])
+    trozos = meanTrozos(np.column_stack((tonos, tramas)), particion)
+    return trozos[:, 1:], trozos[:, 0]
+
+def extraeLoteCorpus(tarea):
+    # corre en un proceso del pool, mientras extrae un archivo un hilo
+    # ya va leyendo el siguiente del disco
+    rutas, particion, optimo = tarea
+    salida = []
+    with ThreadPoolExecutor(max_workers=1) as lector:
+        futuro = lector.submit(leeAudio, rutas[0])
+        for i in range(len(rutas)):
+            voz, Fs = futuro.result()
+            if i + 1 < len(rutas):
+                futuro = lector.submit(leeAudio, rutas[i + 1])
+            voz = cambiaFrecuencia(voz, Fs, 16000)
+            salida.append(extraeRasgos(voz, 16000, particion, optimo))
+    return salida
+
+def extraeCorpus(carpeta, particion, optimo, procesos=1, lote=4, avance=None):
+    # extrae todos los .wav de una carpeta (y subcarpetas) en un solo set,
+    # las clases salen del nombre de cada archivo en orden alfabetico;
+    # devuelve nombres, patrones y archivos por segundo
+    rutas = []
+    for raiz, _, archivos in os.walk(carpeta):
+        rutas += [os.path.join(raiz, a) for a in archivos if a.lower().endswith(".wav")]
+    rutas.sort()
+    tareas = [(rutas[n:(n + lote)], particion, optimo) for n in range(0, len(rutas), lote)]
+    names = []
+    bloques = [np.zeros((0, 15), dtype=float)]
+    inicio = time.perf_counter()
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(max(1, procesos)) as pool:
+        n = 0
+        for salida in pool.imap(extraeLoteCorpus, tareas):
+            for param, tono in salida:
+                nombre = nombreClase(rutas[n])
+                if nombre not in names:
+                    names.append(nombre)
+                bloques.append(bloquePatrones(param, tono, names.index(nombre)))
+                n += 1
+            if avance is not None:
+                avance(n, len(rutas))
+    velocidad = len(rutas) / max(1e-9, time.perf_counter() - inicio)
+    return names, np.concatenate(bloques, axis=0), velocidad
+
+def bloquePatrones(param, tono, ind):
+    # agrega la columna de pitch al inicio y la de clase al final,
+    # tono puede ser un valor o uno por fila
+    bloque = param.copy()
+    aux = np.ones((np.shape(bloque)[0], 1)) * np.reshape(tono, (-1, 1))
+    bloque = np.concatenate((aux, bloque), axis=1)
+    aux = np.ones((np.shape(bloque)[0], 1)) * ind
+    bloque = np.concatenate((bloque, aux), axis=1)
+    return bloque
+
+def extraeArchivo(ruta, particion, optimo, bloque=2**16):
+    # extraeRasgos de un wav llevado a 16 kHz, pero por bloques: lectura,
+    # cambio de frecuencia, MFCC y agrupacion guardan solo lo que falta,
+    # la memoria no crece con el largo del archivo
+    fuente = FuenteAudio(ruta, bloque)
+    frecuencia = FlujoFrecuencia(fuente.Fs, 16000)
+    flujo = FlujoOptimo(16000) if optimo else FlujoMFCC(16000)
+    pitch = FlujoPitch(16000, flujo.largo, flujo.paso)
+    trozos = FlujoTrozos(particion, 14)
+    salida = []
+    for muestras in fuente.bloques():
+        muestras = frecuencia.alimenta(muestras)
+        salida.append(trozos.alimenta(pitch.tramas(muestras, flujo.alimenta(muestras))))
+    muestras = frecuencia.termina()
+    salida.append(trozos.alimenta(pitch.tramas(muestras, flujo.alimenta(muestras))))
+    salida.append(trozos.alimenta(pitch.tramas(np.zeros(0), flujo.termina())))
+    salida.append(trozos.termina())
+    salida = np.concatenate(salida)
+    return salida[:, 1:], salida[:, 0]
+
+def probarArchivo(ruta, pesW, numK, particion, optimo):
+    param, tono = extraeArchivo(ruta, particion, optimo)
+    return multiExecuteDMNN(param, tono, pesW, numK)
+
+def probarAudio(voz, Fs, pesW, numK, particion, optimo):
+    param, tono = extraeRasgos(voz, Fs, particion, optimo)
+    return multiExecuteDMNN(param, tono, pesW, numK)
+
+def matrizConfusion(patrones, pesW, numK):
+    matrix = np.zeros((numK.size, numK.size), dtype=int)
+    with etapa("accuracy"):
+        res = batchExecuteDMNN(patrones[:, :-1], pesW, numK, False)
+        np.add.at(matrix, (patrones[:, -1].astype(int), res), 1)
+    return matrix
+
+def metricasConfusion(matrix):
+    # exactitud (en ingles precision), sensibilidad y accuracy general
+    exacti = np.diagonal(matrix) / np.maximum(1, matrix.sum(axis=0))
+    sensi = np.diagonal(matrix) / np.maximum(1, matrix.sum(axis=1))
+    acc = float(np.diagonal(matrix).sum()) / max(1, matrix.sum())
+    return exacti, sensi, acc
+
+# reconocimiento en tiempo real desde el microfono
+
+class AnilloAudio:
+    # buffer circular de un productor (callback de audio) y un consumidor,
+    # sin candados: el productor solo mueve escrito y el consumidor leido
+
+    def __init__(self, capacidad, marcas=64):
+        self.datos = np.zeros(capacidad, dtype=np.float32)
+        self.escrito = 0
+        self.leido = 0
+        self.perdidas = 0
+        # por cada bloque escrito, en casillas circulares: hasta donde llega
+        # (valor de escrito al terminarlo) y el instante (perf_counter) de
+        # captura de su ultima muestra
+        self.fines = np.full(marcas, -1, dtype=np.int64)
+        self.tiempos = np.zeros(marcas, dtype=float)
+        self.bloques = 0
+
+    def escribe(self, bloque, tiempo):
+        libre = self.datos.size - (self.escrito - self.leido)
+        if bloque.size > libre:
+            self.perdidas += bloque.size - libre
+            bloque = bloque[:libre]
+        ini = self.escrito % self.datos.size
+        primera = min(bloque.size, self.datos.size - ini)
+        self.datos[ini:(ini + primera)] = bloque[:primera]
+        self.datos[:(bloque.size - primera)] = bloque[primera:]
+        casilla = self.bloques % self.fines.size
+        self.tiempos[casilla] = tiempo
+        self.fines[casilla] = self.escrito + bloque.size
+        self.bloques += 1
+        # al final, asi el consumidor nunca ve datos a medio copiar ni un
+        # escrito sin su instante
+        self.escrito += bloque.size
+
+    def lee(self):
+        # devuelve el instante de captura de la ultima muestra entregada (o
+        # uno mas viejo, nunca uno mas nuevo) y las muestras nuevas
+        escrito = self.escrito
+        ini = self.leido % self.datos.size
+        n = escrito - self.leido
+        primera = min(n, self.datos.size - ini)
+        muestras = np.concatenate((self.datos[ini:(ini + primera)],
+                                   self.datos[:(n - primera)])).astype(float)
+        self.leido = escrito
+        return self.instante(escrito), muestras
+
+    def instante(self, escrito):
+        # instante del bloque que termina en escrito; si el productor ya
+        # reuso su casilla (se vuelve a mirar despues de leer) se da el mas
+        # viejo que queda, que es anterior
+        casilla = np.flatnonzero(self.fines == escrito)
+        if casilla.size > 0:
+            tiempo = float(np.min(self.tiempos[casilla]))
+            if np.all(self.fines[casilla] == escrito):
+                return tiempo
+        return float(np.min(self.tiempos))
+
+class FlujoOptimo:
+    # mfcc de python_speech_features por saltos, guarda la cola de audio
+    # que aun no completa trama, asi solo se calculan las tramas nuevas;
+    # el preenfasis se hace aqui con la ultima muestra del bloque anterior
+
+    def __init__(self, Fs, winlen=0.025, winstep=0.01, preemph=0.97):
+        self.Fs = Fs
+        self.largo = int(round(winlen * Fs))
+        self.paso = int(round(winstep * Fs))
+        self.preemph = preemph
+        self.anterior = 0.0
+        self.cola = np.zeros(0, dtype=float)
+        self.total = 0
+        self.hechas = 0
+
+    def alimenta(self, muestras):
+        if muestras.size == 0:
+            return np.zeros((0, 13), dtype=float)
+        enfasis = muestras - self.preemph * np.append(self.anterior, muestras[:-1])
+        self.anterior = muestras[-1]
+        self.total += muestras.size
+        datos = np.concatenate((self.cola, enfasis))
+        if datos.size < self.largo:
+            self.cola = datos
+            return np.zeros((0, 13), dtype=float)
+        cuantas = (datos.size - self.largo) // self.paso + 1
+        # con este largo mfcc saca justo cuantas tramas, sin relleno
+        with etapa("mfcc"):
+            tramas = mfcc(datos[:(self.largo + (cuantas - 1) * self.paso)], self.Fs, preemph=0)
+        self.cola = datos[(cuantas * self.paso):]
+        self.hechas += cuantas
+        return tramas
+
+    def termina(self):
+        # las tramas que faltan, mfcc rellena con ceros la ultima igual que
+        # cuando recibe la señal entera
+        if self.total <= self.largo:
+            cuantas = 1 - self.hechas
+        else:
+            cuantas = 1 + int(np.ceil((self.total - self.largo) / self.paso)) - self.hechas
+        if self.total == 0 or cuantas <= 0:
+            return np.zeros((0, 13), dtype=float)
+        with etapa("mfcc"):
+            tramas = mfcc(self.cola, self.Fs, preemph=0)
+        self.cola = self.cola[:0]
+        self.hechas += cuantas
+        return tramas
+
+class ReconoceFlujo:
+    # guarda las ultimas tramas de ventana segundos y predice con ellas
+
+    def __init__(self, pesW, numK, Fs, particion, ventana=1.0, optimo=True):
+        self.modelo = ModeloDMNN(pesW, numK)
+        self.Fs = Fs
+        self.particion = particion
+        self.flujo = FlujoOptimo(Fs) if optimo else FlujoMFCC(Fs)
+        self.pitch = FlujoPitch(Fs, self.flujo.largo, self.flujo.paso)
+        self.maximo = max(1, int(ventana * Fs / self.flujo.paso))
+        # por trama: pitch y los 13 MFCC
+        self.tramas = np.zeros((0, 14), dtype=float)
+
+    def alimenta(self, muestras):
+        nuevas = self.pitch.tramas(muestras, self.flujo.alimenta(muestras))
+        self.tramas = np.concatenate((self.tramas, nuevas))[-self.maximo:, :]
+
+    def predice(self):
+        if np.shape(self.tramas)[0] == 0:
+            return None
+        trozos = meanTrozos(self.tramas, self.particion)
+        return multiExecuteDMNN(trozos[:, 1:], trozos[:, 0], self.modelo, self.modelo.numK)
+
+class EscuchaDMNN:
+    # lee el microfono con un callback de sounddevice y emite predicciones
+    # cada periodo segundos, con la latencia desde la captura del audio
+
+    def __init__(self, pesW, numK, Fs=16000, particion=10, ventana=1.0, periodo=0.1,
+                 optimo=True):
+        self.Fs = Fs
+        self.periodo = periodo
+        self.reconoce = ReconoceFlujo(pesW, numK, Fs, particion, ventana, optimo)
+        self.anillo = AnilloAudio(int(4 * Fs))
+        self.activo = False
+        self.latencia = 0.0
+
+    def callback(self, indata, frames, tiempo, status):
+        ahora = time.perf_counter()
+        retraso = 0.0
+        if tiempo.inputBufferAdcTime > 0:
+            retraso = tiempo.currentTime - tiempo.inputBufferAdcTime - (frames - 1) / self.Fs
+        self.anillo.escribe(indata[:, 0], ahora - max(0.0, retraso))
+
+    def corre(self, emite):
+        # bloquea hasta que activo sea False, emite(prediction, latencia)
+        import sounddevice as sd
+        self.activo = True
+        ultimo = 0.0
+        with sd.InputStream(samplerate=self.Fs, channels=1, dtype="float32",
+                            blocksize=self.reconoce.flujo.paso, callback=self.callback):
+            while self.activo:
+                tiempo, muestras = self.anillo.lee()
+                if muestras.size == 0:
+                    time.sleep(0.002)
+                    continue
+                self.reconoce.alimenta(muestras)
+                if time.perf_counter() - ultimo >= self.periodo:
+                    prediction = self.reconoce.predice()
+                    if prediction is not None:
+                        ultimo = time.perf_counter()
+                        self.latencia = ultimo - tiempo
+                        emite(prediction, self.latencia)
+
+# funciones de rasgos y de la red DMNN
+
+# rango de busqueda del pitch en Hz y correlacion minima de una trama sonora
+PITCH_MIN = 60.0
+PITCH_MAX = 500.0
+PITCH_UMBRAL = 0.5
+
+def sacarPitch(sound, fs, largo=None, paso=None, cuantas=None):
+    # pitch (F0 en Hz) de cada trama, 0 si no es sonora; por defecto tramas
+    # de 25 ms cada 10 ms como mfcc, la ultima rellena con ceros
+    largo = largo or int(round(0.025 * fs))
+    paso = paso or int(round(0.01 * fs))
+    if cuantas is None:
+        cuantas = 1 + max(0, int(np.ceil((sound.size - largo) / paso)))
+    if cuantas <= 0:
+        return np.zeros(0, dtype=float)
+    with etapa("pitch"):
+        falta = (cuantas - 1) * paso + largo - sound.size
+        sound = np.append(sound, np.zeros(max(0, falta)))
+        # se trabaja a unos 8 kHz promediando muestras vecinas, sobra para F0
+        factor = max(1, int(fs // 8000))
+        if factor > 1 and largo % factor == 0 and paso % factor == 0:
+            sound = sound[:(sound.size - sound.size % factor)].reshape(-1, factor).mean(axis=1)
+            largo, paso, fs = largo // factor, paso // factor, fs / factor
+        return pitchTramas(sliding_window_view(sound, largo)[::paso][:cuantas], fs)
+
+def pitchTramas(frames, fs):
+    # correlacion normalizada de cada trama con ella misma corrida k muestras,
+    # todas las tramas a la vez: autocorrelacion por FFT y energias de las
+    # dos partes que se solapan por sumas acumuladas; el pitch es el primer
+    # pico que llega al 90 % del mayor (evita saltar a la octava de abajo)
+    M, L = np.shape(frames)
+    kmin = max(1, int(fs / PITCH_MAX))
+    kmax = min(int(fs / PITCH_MIN), (2 * L) // 3)
+    if M == 0 or kmax - kmin < 2:
+        return np.zeros(M, dtype=float)
+    x = frames - np.mean(frames, axis=1, keepdims=True)
+    n = 2 ** int(np.ceil(np.log2(2 * L)))
+    espectro = rfft(x, n, axis=1)
+    r = irfft(espectro.real ** 2 + espectro.imag ** 2, n, axis=1)[:, :(kmax + 2)]
+    acumulada = np.concatenate((np.zeros((M, 1)), np.cumsum(x * x, axis=1)), axis=1)
+    k = np.arange(kmax + 2)
+    energia = np.sqrt(acumulada[:, L - k] * (acumulada[:, [L]] - acumulada[:, k]))
+    nccf = np.where(energia > 1e-10, r / np.maximum(energia, 1e-10), 0.0)
+    zona = nccf[:, kmin:(kmax + 1)]
+    pico = (zona[:, 1:-1] >= zona[:, :-2]) & (zona[:, 1:-1] >= zona[:, 2:])
+    pico &= zona[:, 1:-1] >= 0.9 * np.max(zona, axis=1, keepdims=True)
+    lag = np.where(pico.any(axis=1), np.argmax(pico, axis=1) + 1,
+                   np.argmax(zona, axis=1)) + kmin
+    # se afina el retardo con una parabola sobre el pico y sus vecinos
+    filas = np.arange(M)
+    a, b, c = nccf[filas, lag - 1], nccf[filas, lag], nccf[filas, lag + 1]
+    curva = a - 2.0 * b + c
+    delta = np.where(np.abs(curva) > 1e-12, 0.5 * (a - c) / np.where(curva == 0, 1, curva), 0.0)
+    f0 = fs / (lag + np.clip(delta, -0.5, 0.5))
+    return np.where(b >= PITCH_UMBRAL, f0, 0.0)
+
+class FlujoPitch:
+    # sacarPitch por partes, guarda la señal sin preenfasis y saca el pitch
+    # de las mismas tramas que va entregando el flujo de MFCC
+
+    def __init__(self, fs, largo, paso):
+        self.fs = fs
+        self.largo = largo
+        self.paso = paso
+        self.cola = np.zeros(0, dtype=float)
+
+    def tramas(self, muestras, mfccs):
+        # devuelve [pitch, mfcc] de las tramas nuevas del flujo de MFCC,
+        # la ultima del final puede venir rellena con ceros
+        self.cola = np.concatenate((self.cola, muestras))
+        cuantas = np.shape(mfccs)[0]
+        tonos = sacarPitch(self.cola, self.fs, self.largo, self.paso, cuantas)
+        self.cola = self.cola[(cuantas * self.paso):]
+        return np.column_stack((tonos, mfccs))
+
+def meanTrozos(matrix, grupo):
+    return agrupaTrozos(matrix, grupo)
+
+# estadisticas que puede sacar agrupaTrozos, en este orden se apilan
+ESTADISTICAS = ["mean", "std", "min", "max"]
+
+def agrupaTrozos(matrix, grupo, estadisticas=("mean",)):
+    # resume cada grupo de filas en una sola pasada con reduceat, el ultimo
+    # grupo puede quedar incompleto y se resume con las filas que tenga;
+    # las columnas de salida van por estadistica: [mean..., std..., ...]
+    for e in estadisticas:
+        if e not in ESTADISTICAS:
+            raise ValueError("unknown statistic: " + str(e))
+    matrix = np.asarray(matrix, dtype=float)
+    L = np.shape(matrix)
+    if L[0] == 0:
+        return np.zeros((0, L[1] * len(estadisticas)), dtype=float)
+    with etapa("pooling"):
+        inicio = np.arange(0, L[0], grupo)
+        cuenta = np.diff(np.append(inicio, L[0]))[:, np.newaxis]
+        media = np.add.reduceat(matrix, inicio, axis=0) / cuenta
+        salida = []
+        for e in estadisticas:
+            if e == "mean":
+                salida.append(media)
+            elif e == "std":
+                cuadrado = np.add.reduceat(matrix * matrix, inicio, axis=0) / cuenta
+                salida.append(np.sqrt(np.maximum(cuadrado - media * media, 0.0)))
+            elif e == "min":
+                salida.append(np.minimum.reduceat(matrix, inicio, axis=0))
+            else:
+                salida.append(np.maximum.reduceat(matrix, inicio, axis=0))
+        return np.hstack(salida)
+
+class FlujoTrozos:
+    # agrupaTrozos por partes, recibe lotes de tramas de cualquier tamaño y
+    # solo entrega grupos completos, termina() entrega el grupo incompleto,
+    # al concatenar todo sale lo mismo que agrupaTrozos del total
+
+    def __init__(self, grupo, columnas=13, estadisticas=("mean",)):
+        self.grupo = grupo
+        self.estadisticas = estadisticas
+        self.resto = np.zeros((0, columnas), dtype=float)
+
+    def alimenta(self, tramas):
+        datos = np.concatenate((self.resto, np.asarray(tramas, dtype=float)))
+        completas = (np.shape(datos)[0] // self.grupo) * self.grupo
+        self.resto = datos[completas:, :]
+        return agrupaTrozos(datos[:completas, :], self.grupo, self.estadisticas)
+
+    def termina(self):
+        salida = agrupaTrozos(self.resto, self.grupo, self.estadisticas)
+        self.resto = self.resto[:0, :]
+        return salida
+
+class ModeloDMNN:
+    # la red lista para inferencia: WH y WL contiguos en float32 de forma
+    # (entradas, dendritas), asi cada entrada es una fila que se recorre
+    # seguida, y el inicio del segmento de cada clase para reduceat; pesW
+    # sigue plano ([H, L] por dendrita y entrada) para exportar y mutar,
+    # comparte la memoria de pesW si ya es float plano, si se cambia despues
+    # hay que llamar a actualiza
+
+    def __init__(self, pesW, numK):
+        self.pesW = np.asarray(pesW, dtype=float).ravel()
+        self.numK = np.asarray(numK, dtype=int)
+        self.inicios = np.concatenate(([0], np.cumsum(self.numK)[:-1]))
+        self.tam = self.pesW.size // max(1, 2 * int(np.sum(self.numK)))
+        self.WH, self.WL = separaPesos(self.pesW, self.tam)
+
+    def actualiza(self, k=None):
+        # rehace todas las dendritas o solo la k desde pesW
+        if k is None:
+            self.WH, self.WL = separaPesos(self.pesW, self.tam)
+        else:
+            W = self.pesW[k * 2 * self.tam:(k + 1) * 2 * self.tam].reshape(-1, 2)
+            self.WH[:, k] = W[:, 0]
+            self.WL[:, k] = W[:, 1]
+
+    def dendritas(self, entradas, memoria=2 ** 16):
+        return dendritasPesos(entradas, self.WH, self.WL, memoria)
+
+    def clases(self, entradas, memoria=2 ** 16):
+        return clasesPesos(entradas, self.WH, self.WL, self.inicios, memoria)
+
+    def ejecuta(self, entradas, softmax, memoria=2 ** 16):
+        Zm = self.clases(entradas, memoria)
+        if softmax:
+            Ym = np.exp(Zm, dtype=float)
+            Ym /= np.minimum(Ym.sum(axis=1, keepdims=True), 1000000.0)
+            return Ym
+        else:
+            y = np.argmax(Zm, axis=1)
+            return y
+
+def modeloDMNN(pesW, numK):
+    # las funciones de ejecucion aceptan un ModeloDMNN ya armado en lugar
+    # de pesW, asi quien predice muchas veces no lo arma en cada llamada
+    if isinstance(pesW, ModeloDMNN):
+        return pesW
+    return ModeloDMNN(pesW, numK)
+
+def separaPesos(pesW, tam):
+    W = np.asarray(pesW).reshape(-1, tam, 2)
+    WH = np.ascontiguousarray(W[:, :, 0].T, dtype=np.float32)
+    WL = np.ascontiguousarray(W[:, :, 1].T, dtype=np.float32)
+    return WH, WL
+
+def dendritasPesos(entradas, WH, WL, memoria=2 ** 16):
+    # Smk (N, dendritas) completo en float32, solo para quien lo guarda
+    # como la cache del modo delta, para predecir se usa clasesPesos
+    N, D = np.shape(entradas)
+    if N < D:
+        # con menos filas que entradas el ciclo cuesta mas que la matriz
+        X = np.asarray(entradas, dtype=np.float32)[:, :, np.newaxis]
+        return np.minimum(WH - X, X - WL).min(axis=1)
+    Smk = np.empty((N, WH.shape[1]), dtype=np.float32)
+    bloque = max(1, memoria // max(1, WH.shape[1]))
+    aux = np.empty((min(bloque, N), WH.shape[1]), dtype=np.float32)
+    for n in range(0, N, bloque):
+        S = Smk[n:(n + bloque)]
+        dendritasBloque(entradas[n:(n + bloque)], WH, WL, S, aux[:S.shape[0]])
+    return Smk
+
+def clasesPesos(entradas, WH, WL, inicios, memoria=2 ** 16):
+    # Zm (N, clases): cada bloque de filas se reduce por clase apenas se
+    # calcula, asi solo vive un bloque (filas, dendritas) y la memoria no
+    # crece con N por el numero de dendritas
+    N, D = np.shape(entradas)
+    if N < D:
+        return np.maximum.reduceat(dendritasPesos(entradas, WH, WL), inicios, axis=1)
+    Zm = np.empty((N, np.size(inicios)), dtype=np.float32)
+    bloque = max(1, memoria // max(1, WH.shape[1]))
+    S = np.empty((min(bloque, N), WH.shape[1]), dtype=np.float32)
+    T = np.empty_like(S)
+    for n in range(0, N, bloque):
+        X = entradas[n:(n + bloque)]
+        cuantas = np.shape(X)[0]
+        dendritasBloque(X, WH, WL, S[:cuantas], T[:cuantas])
+        Zm[n:(n + cuantas)] = np.maximum.reduceat(S[:cuantas], inicios, axis=1)
+    return Zm
+
+def dendritasBloque(entradas, WH, WL, S, T):
+    # Smk de un bloque de filas en S acumulando el minimo entrada por
+    # entrada, T es otro bloque igual de trabajo; los bloques caben en la
+    # cache y no hay matriz (filas, dendritas, entradas) intermedia
+    X = np.asarray(entradas, dtype=np.float32).T[:, :, np.newaxis]
+    np.subtract(WH[0], X[0], out=S)
+    np.subtract(X[0], WL[0], out=T)
+    np.minimum(S, T, out=S)
+    for d in range(1, X.shape[0]):
+        np.subtract(WH[d], X[d], out=T)
+        np.minimum(S, T, out=S)
+        np.subtract(X[d], WL[d], out=T)
+        np.minimum(S, T, out=S)
+
+def ExecuteDMNN(entrada, pesW, numK, softmax):
+    return modeloDMNN(pesW, numK).ejecuta(np.reshape(entrada, (1, -1)), softmax)[0]
+
+def dendritasDMNN(entradas, pesW, memoria=2 ** 16):
+    # Smk de todos los patrones para unos pesos planos, como los hijos
+    # del entrenamiento que se evaluan una sola vez
+    WH, WL = separaPesos(pesW, np.shape(entradas)[1])
+    return dendritasPesos(entradas, WH, WL, memoria)
+
+def batchExecuteDMNN(entradas, pesW, numK, softmax, memoria=2 ** 16):
+    # igual que ExecuteDMNN pero para una matriz de patrones (N, entradas),
+    # devuelve (N, clases) con softmax o (N,) con la clase ganadora
+    return modeloDMNN(pesW, numK).ejecuta(np.atleast_2d(entradas), softmax, memoria)
+
+def multiExecuteDMNN(param, tono, pesW, numK, filas=2 ** 16):
+    # promedio del softmax de todas las filas, por bloques de filas para
+    # que la entrada armada y las salidas no crezcan con el audio
+    L = np.shape(param)[0]
+    tono = np.reshape(tono, (-1, 1))
+    modelo = modeloDMNN(pesW, numK)
+    prediction = np.zeros(modelo.numK.size, dtype=float)
+    with etapa("inference"):
+        for n in range(0, L, filas):
+            entrada = np.concatenate((tono[n:(n + filas)], param[n:(n + filas)]), axis=1)
+            prediction += modelo.ejecuta(entrada, True).sum(axis=0)
+    prediction /= L
+    return prediction
+
+def ourMFCC(signal, fs, alpha=0.97, frame_size=20e-03, frame_overlap=10e-03,
+            fft_points=320, fft_power=False, f_low=60, f_high=16e03,
+            filter_order=14, MFCC_coef=13):
+    plan = planMFCC(fs, frame_size, frame_overlap, fft_points, fft_power, f_low, f_high,
+                    filter_order, MFCC_coef)
+    samples = len(signal)
+    # se hace un preenfasis, para borrar las frecuencias
+    signal_alpha = np.append(signal[0], signal[1:] - alpha * signal[:-1])
+    # total de frames que se generan parcialmente
+    num_frames = int(np.ceil(float(abs(samples - plan.frame_length) / plan.frame_step)))
+    # cada path va a tener el numero de muestras por solapamiento mas el tamaño de cada frame
+    pad_signal_length = num_frames * plan.frame_step + plan.frame_length
+    # Se añaden los datos extras debidos a los solapamientos
+    zeros = np.zeros((pad_signal_length - samples))
+    pad_signal = np.append(signal_alpha, zeros)
+    return plan.tramas(plan.enmarca(pad_signal, num_frames))
+
+@lru_cache(maxsize=16)
+def planMFCC(fs, frame_size=20e-03, frame_overlap=10e-03, fft_points=320, fft_power=False,
+             f_low=60, f_high=16e03, filter_order=14, MFCC_coef=13):
+    # un plan por cada configuracion, se arma una sola vez
+    return PlanMFCC(fs, int(round(frame_size * fs)), int(round(frame_overlap * fs)),
+                    fft_points, fft_power, f_low, f_high, filter_order, MFCC_coef)
+
+class PlanMFCC:
+    # lo que no depende de la señal: ventana hamming y banco de filtros mel,
+    # el banco ya viene doblado sobre la mitad real del espectro (rfft)
+
+    def __init__(self, fs, frame_length, frame_step, fft_points, fft_power, f_low, f_high,
+                 filter_order, MFCC_coef):
+        if fft_points > frame_length:
+            raise ValueError("fft_points bigger than frame...")
+        self.frame_length = frame_length
+        self.frame_step = frame_step
+        self.fft_points = fft_points
+        self.fft_power = fft_power
+        self.MFCC_coef = MFCC_coef
+        self.ventana = np.hamming(frame_length)
+        Hm = bancoMel(fs, fft_points, f_low, f_high, filter_order)
+        # en señales reales |X[k]| = |X[N - k]|, los pesos de cada par se suman
+        k = np.arange(fft_points)
+        espejo = np.minimum(k, frame_length - k)
+        self.Hr = np.zeros((filter_order, frame_length // 2 + 1))
+        np.add.at(self.Hr.T, espejo, Hm.T)
+
+    def enmarca(self, pad_signal, num_frames):
+        # vista de las tramas sin copiar la señal
+        vista = sliding_window_view(pad_signal, self.frame_length)
+        return vista[::self.frame_step][:num_frames]
+
+    def tramas(self, frames):
+        # coeficientes de una matriz de tramas ya con preenfasis, cada fila
+        # se procesa sola, asi ourMFCC y FlujoMFCC dan lo mismo
+        fft_frames_mag = np.abs(rfft(frames * self.ventana, axis=1)) / self.fft_points
+        if self.fft_power:
+            fft_frames_mag = (fft_frames_mag ** 2)
+        frames_filtered = np.dot(fft_frames_mag, self.Hr.T)
+        # una trama en silencio digital da energia 0 y log de 0 es -inf,
+        # se pone un piso como python_speech_features
+        frames_filtered = np.maximum(frames_filtered, np.finfo(float).eps)
+        frames_filtered_log = 20 * np.log10(frames_filtered)
+        miMFCC = dct(frames_filtered_log, type=2, axis=1, norm='ortho')
+        return miMFCC[:, 1: self.MFCC_coef + 1]
+
+def bancoMel(fs, fft_points, f_low, f_high, filter_order):
+    # genero las ecuaciones para transformar los datos
+    hz2mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    mel2hz = lambda mel: 700 * (10 ** (mel / 2595) - 1)
+    # Se genera los puntos en escala de mel, transformados a herz
+    mel = np.linspace(hz2mel(f_low), hz2mel(f_high), filter_order + 2)
+    mel_hz = mel2hz(mel)
+    # Inicia la creacion de los coeficientes mel
+    f_i = np.floor((fft_points + 1) * mel_hz) / fs
+    # Genero el filtro Mel, subida y bajada de cada triangulo
+    k = np.arange(int(np.floor(fft_points)))
+    f_m_1 = f_i[:-2, np.newaxis]
+    f_m = f_i[1:-1, np.newaxis]
+    f_m_plus_1 = f_i[2:, np.newaxis]
+    sube = (k >= f_m_1.astype(int)) & (k < f_m.astype(int))
+    baja = (k >= f_m.astype(int)) & (k < f_m_plus_1.astype(int))
+    Hm = np.where(sube, (k - f_m_1) / (f_m - f_m_1), 0.0)
+    Hm = np.where(baja, (f_m_plus_1 - k) / (f_m_plus_1 - f_m), Hm)
+    return np.where(Hm <= 0, np.finfo(float).eps, Hm)  # Numerical Stability
+
+class FlujoMFCC:
+    # ourMFCC por bloques de cualquier tamaño con memoria constante: guarda
+    # la ultima muestra para el preenfasis y la cola de la trama incompleta;
+    # la trama i sale cuando ya llego al menos una muestra despues de ella,
+    # igual que el conteo de tramas de ourMFCC, y termina() hace el relleno
+
+    def __init__(self, fs, alpha=0.97, frame_size=20e-03, frame_overlap=10e-03, **otros):
+        self.alpha = alpha
+        self.plan = planMFCC(fs, frame_size, frame_overlap, **otros)
+        self.largo = self.plan.frame_length
+        self.paso = self.plan.frame_step
+        self.anterior = 0.0
+        self.cola = np.zeros(0, dtype=float)
+        self.total = 0
+        self.hechas = 0
+
+    def alimenta(self, muestras):
+        if len(muestras) == 0:
+            return self.saca(0)
+        muestras = np.asarray(muestras, dtype=float)
+        previas = np.append(self.anterior, muestras[:-1])
+        self.anterior = muestras[-1]
+        self.total += muestras.size
+        self.cola = np.concatenate((self.cola, muestras - self.alpha * previas))
+        if self.total <= self.largo:
+            return self.saca(0)
+        return self.saca(int(np.ceil(float((self.total - self.largo) / self.paso))) - self.hechas)
+
+    def termina(self):
+        # las tramas que faltan, rellenas con ceros como en ourMFCC
+        cuantas = int(np.ceil(float(abs(self.total - self.largo) / self.paso))) - self.hechas
+        falta = (cuantas - 1) * self.paso + self.largo - self.cola.size
+        self.cola = np.append(self.cola, np.zeros(max(0, falta)))
+        return self.saca(cuantas)
+
+    def saca(self, cuantas):
+        if cuantas <= 0:
+            return np.zeros((0, self.plan.MFCC_coef), dtype=float)
+        with etapa("mfcc"):
+            frames = self.plan.enmarca(self.cola, cuantas)
+            self.cola = self.cola[(cuantas * self.paso):]
+            self.hechas += cuantas
+            return self.plan.tramas(frames)
+
+# inicializacion de la red
+
+def semillasKmedias(matrix, clusters, rng):
+    # semillas k-means++, cada centro nuevo se elige al azar con
+    # probabilidad proporcional a su distancia^2 al centro mas cercano
+    L = np.shape(matrix)[0]
+    centros = np.zeros((clusters, np.shape(matrix)[1]))
+    centros[0, :] = matrix[rng.integers(L), :]
+    dist = np.sum(np.power(matrix - centros[0, :], 2), axis=1)
+    for c in range(1, clusters):
+        total = dist.sum()
+        if total > 0:
+            p = rng.choice(L, p=dist / total)
+        else:
+            p = rng.integers(L)
+        centros[c, :] = matrix[p, :]
+        dist = np.minimum(dist, np.sum(np.power(matrix - centros[c, :], 2), axis=1))
+    return centros
+
+def distanciasKmedias(matrix, centros):
+    # matriz (puntos, centros) de distancias^2 en una sola operacion
+    dist = np.sum(np.power(matrix, 2), axis=1)[:, np.newaxis] - \
+           2.0 * np.dot(matrix, centros.T) + np.sum(np.power(centros, 2), axis=1)
+    return np.maximum(dist, 0.0)
+
+def Kmedias(matrix, clusters, iteraciones, tolerancia=1e-4, semilla=None):
+    # crear las estructuras de datos y la inicializacion k-means++
+    rng = np.random.default_rng(semilla)
+    L, D = np.shape(matrix)
+    centros = semillasKmedias(matrix, clusters, rng)
+    # la tolerancia es relativa al rango de los datos
+    escala = max(np.max(np.ptp(matrix, axis=0)), np.finfo(float).eps)
+    # comenzar el ciclo con sus dos partes
+    for i in range(iteraciones):
+        # asociar los puntos al centroide mas cercano
+        dist = distanciasKmedias(matrix, centros)
+        grupo = np.argmin(dist, axis=1)
+        # mover los centroides a sus puntos asociados
+        t = np.bincount(grupo, minlength=clusters)
+        nuevos = np.zeros((clusters, D))
+        for d in range(D):
+            nuevos[:, d] = np.bincount(grupo, weights=matrix[:, d], minlength=clusters)
+        nuevos /= np.maximum(t, 1)[:, np.newaxis]
+        # los clusters vacios se llevan a los puntos peor representados
+        vacios = np.flatnonzero(t == 0)
+        if vacios.size > 0:
+            lejos = np.argsort(dist[np.arange(L), grupo])[::-1]
+            nuevos[vacios, :] = matrix[np.resize(lejos, vacios.size), :]
+        # frenar si los centros casi no se movieron
+        movido = np.max(np.abs(nuevos - centros))
+        centros = nuevos
+        if movido <= tolerancia * escala:
+            break
+    return centros
+
+def centrosClase(tarea):
+    matrix, clusters, iteraciones, semilla = tarea
+    return Kmedias(matrix, clusters, iteraciones, semilla=semilla)
+
+def inicializaDMNN(patrones, clusters, iteraciones, dimCajas, procesos=1, semilla=None):
+    # calcular dimension de las hiper-cajas
+    dMax = np.max(patrones[:, :-1], axis=0)
+    dMin = np.min(patrones[:, :-1], axis=0)
+    dim = (dMax - dMin) * 0.5 * (dimCajas / 100.0)
+    # inicializar la red
+    numK = np.ones(int(patrones[:, -1].max() + 1), dtype=int) * clusters
+    pesW = np.array([])
+    # cada clase tiene su propia semilla, asi el resultado no depende
+    # de cuantos procesos se usen
+    semillas = np.random.SeedSequence(semilla).spawn(numK.size)
+    tareas = [(patrones[patrones[:, -1] == m, :-1], clusters, iteraciones, semillas[m])
+              for m in range(numK.size)]
+    with etapa("init"):
+        if procesos > 1 and numK.size > 1:
+            contexto = multiprocessing.get_context("spawn")
+            with contexto.Pool(min(procesos, numK.size)) as pool:
+                centros = pool.map(centrosClase, tareas, chunksize=1)
+        else:
+            centros = [centrosClase(t) for t in tareas]
+    # ciclo para armar los pesos en orden de clase
+    for m in range(numK.size):
+        cen = centros[m]
+        vH = (cen + dim).ravel()
+        vL = (cen - dim).ravel()
+        pesW = np.concatenate((pesW, np.dstack((vH, vL)).ravel()))
+    return pesW, numK
+
+# inicializacion por mini-lotes (K-means de Sculley), para corpus muy grandes:
+# patrones puede ser un np.memmap, solo se leen bloques de lote filas, asi la
+# memoria pico depende de lote y reserva, no del numero de patrones;
+# a cambio los centros son una aproximacion, con pocas iteraciones quedan
+# algo peor ubicados que con Kmedias completo (mayor suma de distancias),
+# mas iteraciones o lotes mas grandes acercan el resultado al de Kmedias
+
+def reservaLotes(patrones, lote, reserva, rng):
+    # una pasada por bloques: rangos, numero de clases y una muestra
+    # uniforme por clase (las filas con las menores llaves al azar)
+    N, D = np.shape(patrones)
+    dMax = np.full(D - 1, -np.inf)
+    dMin = np.full(D - 1, np.inf)
+    muestras = {}
+    for n in range(0, N, lote):
+        bloque = np.asarray(patrones[n:(n + lote), :], dtype=float)
+        dMax = np.maximum(dMax, bloque[:, :-1].max(axis=0))
+        dMin = np.minimum(dMin, bloque[:, :-1].min(axis=0))
+        llaves = rng.random(bloque.shape[0])
+        for m in np.unique(bloque[:, -1]).astype(int):
+            filas = bloque[:, -1] == m
+            viejo = muestras.get(m, (np.zeros(0), np.zeros((0, D - 1))))
+            llave = np.concatenate((viejo[0], llaves[filas]))
+            datos = np.concatenate((viejo[1], bloque[filas, :-1]))
+            if llave.size > reserva:
+                quedan = np.argpartition(llave, reserva)[:reserva]
+                llave, datos = llave[quedan], datos[quedan, :]
+            muestras[m] = (llave, datos)
+    return dMax, dMin, muestras
+
+def inicializaDMNNlotes(patrones, clusters, iteraciones, dimCajas, lote=4096, semilla=None):
+    rng = np.random.default_rng(semilla)
+    N = np.shape(patrones)[0]
+    lote = max(1, min(lote, N))
+    with etapa("init"):
+        dMax, dMin, muestras = reservaLotes(patrones, lote, max(lote, 10 * clusters), rng)
+        dim = (dMax - dMin) * 0.5 * (dimCajas / 100.0)
+        numK = np.ones(max(muestras) + 1, dtype=int) * clusters
+        # semillas k-means++ sobre la muestra de cada clase
+        centros = [semillasKmedias(muestras[m][1], clusters, rng) for m in range(numK.size)]
+        vistos = np.zeros((numK.size, clusters))
+        # cada iteracion lee lote filas al azar de todo el archivo (no un
+        # bloque contiguo, los patrones suelen venir ordenados por clase) y
+        # mueve los centros; los indices van ordenados para leer el memmap
+        # hacia adelante
+        for i in range(iteraciones):
+            filas = np.sort(rng.choice(N, lote, replace=False))
+            bloque = np.asarray(patrones[filas, :], dtype=float)
+            for m in np.unique(bloque[:, -1]).astype(int):
+                X = bloque[bloque[:, -1] == m, :-1]
+                grupo = np.argmin(distanciasKmedias(X, centros[m]), axis=1)
+                t = np.bincount(grupo, minlength=clusters)
+                suma = np.zeros((clusters, X.shape[1]))
+                for d in range(X.shape[1]):
+                    suma[:, d] = np.bincount(grupo, weights=X[:, d], minlength=clusters)
+                vistos[m, :] += t
+                # tasa de aprendizaje 1 / puntos vistos por centro
+                paso = (t / np.maximum(vistos[m, :], 1))[:, np.newaxis]
+                centros[m] += paso * (suma / np.maximum(t, 1)[:, np.newaxis] - centros[m])
+    pesW = np.array([])
+    for m in range(numK.size):
+        vH = (centros[m] + dim).ravel()
+        vL = (centros[m] - dim).ravel()
+        pesW = np.concatenate((pesW, np.dstack((vH, vL)).ravel()))
+    return pesW, numK
+
+# entrenamiento genetico de la red
+
+class EntrenaDMNN:
+
+    def __init__(self):
+        self.patrones = np.zeros((0, 15), dtype=float)
+        self.pesW = np.array([0.0])
+        self.numK = np.array([0])
+        self.iteracion = [0, 100]
+        self.muta = 1.0
+        # curva de error: un punto cada llamada a iterar, en un arreglo que
+        # dobla su tamaño cuando se llena, error es la parte ya escrita
+        self.curva = np.zeros(64, dtype=float)
+        self.puntos = 1
+        # genetic: muta todo pesW, delta: muta una dendrita con Smk en cache
+        # population: evalua varios hijos por generacion en paralelo
+        # boxes: agrega y encoge cajas a partir de los patrones, sin azar
+        self.modo = "genetic"
+        self.Smk = None
+        self.Zm = None
+        # pesW, numK y patrones con los que se armo la cache de delta
+        self.fuenteDelta = None
+        # ModeloDMNN de los pesos actuales, delta lo mantiene con actualiza(k)
+        self.modelo = None
+        self.fuente = None
+        self.poblacion = max(2, os.cpu_count() or 1)
+        self.pool = None
+        self.memoria = None
+        self.velocidad = 0.0
+        self.cajas = None
+        self.maxCajas = 256
+        # pasos auto adaptativos: cada dendrita lleva su paso por entrada,
+        # empieza en muta escalado al rango de cada entrada y el hijo lo
+        # cambia por un factor log-normal, se guarda solo si baja el error
+        self.adapta = True
+        self.pasos = None
+        self.base = None
+        # estancamiento: sin mejorar el error en paciencia iteraciones se
+        # termina, 0 es automatico segun el modo y negativo no se detiene
+        self.paciencia = 0
+        self.mejora = 0
+        self.estancado = False
+        # por que termino entrena: iterations, stall, error 0, converged
+        # (boxes sin cambios) o stopped (cancelado)
+        self.parada = ""
+        # errores meta, alcanzadas guarda (iteracion, segundos) de cada una
+        self.metas = []
+        self.alcanzadas = {}
+        self.inicio = None
+
+    @property
+    def error(self):
+        return self.curva[:self.puntos]
+
+    @error.setter
+    def error(self, valores):
+        valores = np.asarray(valores, dtype=float).ravel()
+        self.curva = np.zeros(max(64, 2 * valores.size), dtype=float)
+        self.curva[:valores.size] = valores
+        self.puntos = valores.size
+
+    def anotaError(self, valor):
+        if self.puntos == self.curva.size:
+            self.curva = np.concatenate((self.curva, np.zeros(self.curva.size)))
+        self.curva[self.puntos] = valor
+        self.puntos += 1
+
+    def entrena(self, avance=None, cancelado=None, periodo=0.25, cada=10):
+        # corre todas las iteraciones en el mismo hilo, o hasta que
+        # cancelado() sea True, con un punto de la curva cada 'cada'
+        # iteraciones; avance(self) se llama como mucho una vez por periodo
+        # segundos y al final, velocidad es el promedio de iteraciones/s
+        inicio = time.perf_counter()
+        ultimo = inicio
+        hechas = self.iteracion[0]
+        self.inicio = inicio
+        self.mejora = hechas
+        self.parada = ""
+        self.anotaMetas(self.error[-1])
+        try:
+            while self.iteracion[0] < self.iteracion[1]:
+                if cancelado is not None and cancelado():
+                    self.parada = "stopped"
+                    break
+                self.iterar(cada)
+                ahora = time.perf_counter()
+                self.velocidad = (self.iteracion[0] - hechas) / max(1e-9, ahora - inicio)
+                if avance is not None and ahora - ultimo >= periodo:
+                    ultimo = ahora
+                    avance(self)
+        finally:
+            self.cierraPool()
+        if self.parada == "":
+            self.parada = "iterations"
+        if avance is not None:
+            avance(self)
+
+    def iterar(self, cuantas=10):
+        # hace hasta cuantas iteraciones y agrega el error a la curva
+        error = self.error[-1]
+        limit = min(self.iteracion[0] + cuantas, self.iteracion[1])
+        inicio = time.perf_counter()
+        hechas = self.iteracion[0]
+        if self.inicio is None:
+            self.inicio = inicio
+        if self.adapta and self.pasos is None and self.modo != "boxes":
+            self.iniciaPasos()
+        paciencia = self.paciencia
+        if paciencia == 0:
+            # delta prueba una dendrita por iteracion, se le dan 20 a cada una
+            paciencia = max(2000, 20 * int(np.sum(self.numK))) if self.modo == "delta" else 2000
+        # se mide el bloque junto, medir cada iteracion frena mucho a delta
+        with etapa("fitness"):
+            while self.iteracion[0] < limit:
+                self.iteracion[0] += 1
+                if self.modo == "delta":
+                    newerror = self.mutaDelta(error)
+                elif self.modo == "population":
+                    newerror = self.mutaPoblacion(error)
+                elif self.modo == "boxes":
+                    newerror = self.creceCajas(error)
+                elif self.pasos is not None:
+                    hijo, pasos = self.mutaPasos(self.pesW, self.pasos)
+                    newerror = self.funError(hijo)
+                    if newerror <= error:
+                        self.pesW = hijo
+                    if newerror < error:
+                        self.pasos = pasos
+                else:
+                    hijo = self.pesW.copy() + \
+                        (np.random.rand(self.pesW.size) * 2.0 - 1.0) * self.muta
+                    newerror = self.funError(hijo)
+                    if newerror <= error:
+                        self.pesW = hijo.copy()
+                if newerror < error:
+                    self.mejora = self.iteracion[0]
+                    self.anotaMetas(newerror)
+                if newerror <= error:
+                    if newerror == 0:
+                        self.parada = "error 0"
+                        self.iteracion[0] = self.iteracion[1]
+                    error = newerror
+                if paciencia > 0 and self.iteracion[1] > self.iteracion[0] >= self.mejora + paciencia:
+                    self.estancado = True
+                    self.parada = "stall"
+                    self.iteracion[0] = self.iteracion[1]
+        self.anotaError(error)
+        self.velocidad = (self.iteracion[0] - hechas) / max(1e-9, time.perf_counter() - inicio)
+
+    def iniciaPasos(self):
+        rango = np.maximum(np.ptp(self.patrones[:, :-1], axis=0), 1e-12)
+        self.base = np.repeat(self.muta * rango / np.max(rango), 2)
+        self.pasos = np.tile(self.base, (self.pesW.size // self.base.size, 1))
+
+    def mutaPasos(self, pesos, pasos):
+        # los pasos de cada fila (dendrita) se multiplican por su factor,
+        # entre 1/1000 y 100 veces el paso inicial
+        factor = np.exp(0.3 * np.random.randn(pasos.shape[0], 1))
+        pasos = np.clip(pasos * factor, self.base * 1e-3, self.base * 1e2)
+        hijo = pesos + (np.random.rand(pesos.size) * 2.0 - 1.0) * pasos.ravel()
+        return hijo, pasos
+
+    def anotaMetas(self, error):
+        for meta in self.metas:
+            if error <= meta and meta not in self.alcanzadas:
+                self.alcanzadas[meta] = (self.iteracion[0], time.perf_counter() - self.inicio)
+
+    def mutaPoblacion(self, error):
+        # genera varios hijos y los evalua en el pool de procesos,
+        # se queda con el mejor si no empeora el error
+        if self.pool is None:
+            self.abrePool()
+        if self.pasos is None:
+            hijos = [self.pesW + (np.random.rand(self.pesW.size) * 2.0 - 1.0) * self.muta
+                     for _ in range(self.poblacion)]
+        else:
+            hijos, pasos = zip(*[self.mutaPasos(self.pesW, self.pasos)
+                                 for _ in range(self.poblacion)])
+        errores = self.pool.map(errorTrabajador, hijos)
+        mejor = int(np.argmin(errores))
+        if errores[mejor] <= error:
+            self.pesW = hijos[mejor].copy()
+        if self.pasos is not None and errores[mejor] < error:
+            self.pasos = pasos[mejor]
+        return errores[mejor]
+
+    def abrePool(self):
+        # los patrones van a memoria compartida, no se copian en cada tarea
+        self.memoria = shared_memory.SharedMemory(create=True, size=max(1, self.patrones.nbytes))
+        compartido = np.ndarray(self.patrones.shape, dtype=float, buffer=self.memoria.buf)
+        compartido[:] = self.patrones
+        contexto = multiprocessing.get_context("spawn")
+        self.pool = contexto.Pool(min(self.poblacion, os.cpu_count() or 1), iniciaTrabajador,
+                                  (self.memoria.name, self.patrones.shape, self.numK))
+
+    def cierraPool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.memoria is not None:
+            self.memoria.close()
+            self.memoria.unlink()
+            self.memoria = None
+
+    def mutaDelta(self, error):
+        # muta una sola dendrita y recalcula solo su columna de Smk y el
+        # maximo de su clase, si no mejora se deja la cache como estaba
+        entradas = self.patrones[:, :-1]
+        inicios = self.modeloActual().inicios
+        if self.Smk is None or not self.cacheVigente():
+            self.Smk = self.modeloActual().dendritas(entradas)
+            self.Zm = np.maximum.reduceat(self.Smk, inicios, axis=1)
+            self.fuenteDelta = (self.pesW, self.numK, self.patrones)
+        tam = 2 * np.shape(entradas)[1]
+        k = np.random.randint(self.Smk.shape[1])
+        m = np.searchsorted(inicios, k, side="right") - 1
+        if self.pasos is None:
+            hijo = self.pesW[k * tam:(k + 1) * tam] + (np.random.rand(tam) * 2.0 - 1.0) * self.muta
+        else:
+            hijo, pasos = self.mutaPasos(self.pesW[k * tam:(k + 1) * tam], self.pasos[k:k + 1])
+        columna = dendritasDMNN(entradas, hijo)[:, 0]
+        segmento = self.Smk[:, inicios[m]:(inicios[m] + self.numK[m])].copy()
+        segmento[:, k - inicios[m]] = columna
+        viejo = self.Zm[:, m].copy()
+        self.Zm[:, m] = segmento.max(axis=1)
+        res = float(np.sum(self.patrones[:, -1] == np.argmax(self.Zm, axis=1)))
+        newerror = 1.0 - (res / np.shape(entradas)[0])
+        if newerror <= error:
+            self.pesW[k * tam:(k + 1) * tam] = hijo
+            self.modeloActual().actualiza(k)
+            self.Smk[:, k] = columna
+            if self.pasos is not None and newerror < error:
+                self.pasos[k] = pasos[0]
+        else:
+            self.Zm[:, m] = viejo
+        return newerror
+
+    def creceCajas(self, error):
+        # una ronda constructiva: evalua la red que se esta creciendo
+        # (self.cajas), si es la mejor la copia a pesW/numK, luego encoge las
+        # cajas de otra clase que les ganan a patrones cubiertos por su clase
+        # y agrega cajas para los mal clasificados que su clase no cubre
+        entradas = self.patrones[:, :-1]
+        clase = self.patrones[:, -1].astype(int)
+        if self.cajas is None:
+            self.cajas = (self.pesW.reshape(-1, np.shape(entradas)[1], 2).copy(), self.numK.copy())
+        cajas, numK = self.cajas
+        modelo = ModeloDMNN(cajas.ravel(), numK)
+        Zm = modelo.clases(entradas)
+        res = np.argmax(Zm, axis=1)
+        newerror = 1.0 - float(np.sum(res == clase)) / np.shape(entradas)[0]
+        if newerror <= error:
+            self.pesW = cajas.ravel().copy()
+            self.numK = numK.copy()
+            self.Smk = None
+        # margen de las caras nuevas, proporcional al rango de cada entrada
+        escala = np.maximum(np.ptp(entradas, axis=0), 1e-12) * 1e-3
+        mal = np.flatnonzero(res != clase)
+        cubierto = Zm[mal, clase[mal]] >= 0
+        # Smk por dendrita solo de los patrones que van a recortar cajas
+        Smk = modelo.dendritas(entradas[mal[cubierto]])
+        cortes = self.encogeCajas(cajas, numK, entradas, mal[cubierto], clase, Smk, Zm, res, escala)
+        sinCubrir = mal[~cubierto]
+        cajas, nuevoK = self.agregaCajas(cajas, numK, entradas[sinCubrir], clase[sinCubrir], escala)
+        if cortes == 0 and np.array_equal(nuevoK, numK):
+            # nada que encoger ni agregar, la red ya no cambia
+            self.parada = "converged"
+            self.iteracion[0] = self.iteracion[1]
+        self.cajas = (cajas, nuevoK)
+        return newerror
+
+    def agregaCajas(self, cajas, numK, entradas, clase, escala, nuevas=2):
+        # por clase agrupa los patrones sin cubrir en hasta 'nuevas' grupos
+        # con K-means y agrega la caja que encierra a cada grupo al final
+        # del segmento de la clase, sin pasar de maxCajas por clase
+        numK = numK.copy()
+        for c in np.unique(clase)[::-1]:
+            grupo = entradas[clase == c]
+            cuantas = min(nuevas, grupo.shape[0], self.maxCajas - numK[c])
+            if cuantas <= 0:
+                continue
+            centros = Kmedias(grupo, cuantas, 10, semilla=0)
+            cual = np.argmin(distanciasKmedias(grupo, centros), axis=1)
+            nueva = [np.stack((grupo[cual == h].max(axis=0) + escala,
+                               grupo[cual == h].min(axis=0) - escala), axis=1)
+                     for h in range(cuantas) if np.any(cual == h)]
+            fin = int(np.sum(numK[:c + 1]))
+            cajas = np.concatenate((cajas[:fin], np.array(nueva), cajas[fin:]))
+            numK[c] += len(nueva)
+        return cajas, numK
+
+    def encogeCajas(self, cajas, numK, entradas, mal, clase, Smk, Zm, res, escala):
+        # cada patron mal clasificado pero cubierto por su clase recorta la
+        # caja ganadora por la cara que menos ancho relativo le quita, hasta
+        # que su margen quede debajo del de la clase correcta; Smk trae solo
+        # las filas de mal
+        propio = Zm[mal, clase[mal]]
+        claseK = np.repeat(np.arange(numK.size), numK)
+        otra = np.where(claseK[np.newaxis, :] == res[mal][:, np.newaxis], Smk, -np.inf)
+        gana = np.argmax(otra, axis=1)
+        tam = np.shape(entradas)[1]
+        cortes = 0
+        for i in range(mal.size):
+            x = entradas[mal[i]]
+            s = propio[i]
+            WH = cajas[gana[i], :, 0]
+            WL = cajas[gana[i], :, 1]
+            # un corte anterior de la misma caja ya pudo sacar a este patron
+            if np.min(np.minimum(WH - x, x - WL)) < s:
+                continue
+            arriba = WH - (x + s - escala)
+            abajo = (x - s + escala) - WL
+            ancho = np.maximum(WH - WL, 1e-12)
+            costo = np.concatenate((np.where(arriba > 0, arriba / ancho, np.inf),
+                                    np.where(abajo > 0, abajo / ancho, np.inf)))
+            j = int(np.argmin(costo))
+            if j < tam:
+                WH[j] -= arriba[j]
+            else:
+                WL[j - tam] += abajo[j - tam]
+            cortes += 1
+        return cortes
+
+    def cacheVigente(self):
+        # la cache de delta no sirve si pesW, numK o patrones se reemplazaron
+        # desde afuera (un entrenador reusado con otra red o con otros datos)
+        if self.fuenteDelta is None:
+            return False
+        return all(a is b for a, b in zip(self.fuenteDelta, (self.pesW, self.numK, self.patrones)))
+
+    def modeloActual(self):
+        # se rearma solo cuando pesW o numK se reemplazan por otros arreglos
+        if self.fuente is None or self.fuente[0] is not self.pesW or self.fuente[1] is not self.numK:
+            self.modelo = ModeloDMNN(self.pesW, self.numK)
+            self.fuente = (self.pesW, self.numK)
+        return self.modelo
+
+    def funError(self, pesW):
+        # los hijos se arman al evaluarlos, los pesos actuales usan el modelo
+        L = np.shape(self.patrones)[0]
+        if pesW is self.pesW:
+            pesW = self.modeloActual()
+        res = batchExecuteDMNN(self.patrones[:, :-1], pesW, self.numK, False)
+        res = float(np.sum(self.patrones[:, -1] == res))
+        return 1.0 - (res / L)
+
+# funciones de los procesos del entrenamiento por poblacion
+
+trabajador = {}
+
+def iniciaTrabajador(nombre, forma, numK):
+    memoria = shared_memory.SharedMemory(name=nombre)
+    trabajador["memoria"] = memoria
+    trabajador["patrones"] = np.ndarray(forma, dtype=float, buffer=memoria.buf)
+    trabajador["numK"] = numK
+
+def errorTrabajador(pesW):
+    patrones = trabajador["patrones"]
+    res = batchExecuteDMNN(patrones[:, :-1], pesW, trabajador["numK"], False)
+    res = float(np.sum(patrones[:, -1] == res))
+    return 1.0 - (res / np.shape(patrones)[0])
+
+# planificador de trabajos
+
+class Trabajo:
+    # una tarea del planificador: funcion(trabajo) corre en un hilo del pool
+    # y devuelve el resultado, puede revisar trabajo.cancelado y avisar su
+    # avance con trabajo.avanza(dato); recursos son nombres que no pueden usar
+    # dos trabajos a la vez, depende son trabajos que deben acabar bien antes,
+    # detiene() se llama al cancelarlo (por ejemplo para soltar el microfono)
+    # y datos guarda lo que necesite quien lo recibe al final
+
+    def __init__(self, tipo, funcion, recursos=(), depende=(), detiene=None, medidor=None,
+                 **datos):
+        self.tipo = tipo
+        self.funcion = funcion
+        self.recursos = set(recursos)
+        self.depende = [d for d in depende if d is not None]
+        self.detiene = detiene
+        self.medidor = medidor
+        self.datos = datos
+        # waiting, running, done, failed o cancelled
+        self.estado = "waiting"
+        self.cancelado = False
+        self.resultado = None
+        self.error = None
+        self.avance = None
+        self.segundos = 0.0
+        self.planificador = None
+
+    def avanza(self, dato):
+        self.avance = dato
+        if self.planificador is not None:
+            self.planificador.avisa(self, "progress")
+
+    def cancela(self):
+        self.cancelado = True
+        if self.detiene is not None:
+            self.detiene()
+
+    def terminado(self):
+        return self.estado in ("done", "failed", "cancelled")
+
+class Planificador:
+    # cola de trabajos con un pool acotado de hilos, lanza en orden de llegada
+    # cada trabajo con sus dependencias hechas y sus recursos libres (uno que
+    # espera aparta sus recursos, asi los que llegan despues no se le cuelan);
+    # si una dependencia falla o se cancela el trabajo se cancela; un trabajo
+    # cancelado mientras corre acaba como done con lo que alcanzo a hacer;
+    # aviso(trabajo, evento) recibe "start", "progress" y "end" desde el hilo
+    # del trabajo
+
+    def __init__(self, hilos=None, aviso=None):
+        self.hilos = hilos or max(2, min(4, os.cpu_count() or 1))
+        self.aviso = aviso
+        self.pool = ThreadPoolExecutor(max_workers=self.hilos)
+        self.candado = threading.Lock()
+        self.cola = []
+        self.corriendo = []
+
+    def avisa(self, trabajo, evento):
+        if self.aviso is not None:
+            self.aviso(trabajo, evento)
+
+    def agrega(self, trabajo):
+        trabajo.planificador = self
+        with self.candado:
+            self.cola.append(trabajo)
+        self.lanza()
+        return trabajo
+
+    def lanza(self):
+        cancelados = []
+        with self.candado:
+            ocupados = set()
+            for trabajo in self.corriendo:
+                ocupados |= trabajo.recursos
+            for trabajo in list(self.cola):
+                if trabajo.cancelado or any(d.estado in ("failed", "cancelled")
+                                            for d in trabajo.depende):
+                    self.cola.remove(trabajo)
+                    trabajo.estado = "cancelled"
+                    cancelados.append(trabajo)
+                    continue
+                listo = all(d.estado == "done" for d in trabajo.depende)
+                if listo and len(self.corriendo) < self.hilos and \
+                        len(trabajo.recursos & ocupados) == 0:
+                    self.cola.remove(trabajo)
+                    trabajo.estado = "running"
+                    self.corriendo.append(trabajo)
+                    self.pool.submit(self.corre, trabajo)
+                ocupados |= trabajo.recursos
+        for trabajo in cancelados:
+            self.avisa(trabajo, "end")
+
+    def corre(self, trabajo):
+        self.avisa(trabajo, "start")
+        inicio = time.perf_counter()
+        try:
+            if trabajo.medidor is not None:
+                with trabajo.medidor:
+                    trabajo.resultado = trabajo.funcion(trabajo)
+            else:
+                trabajo.resultado = trabajo.funcion(trabajo)
+            trabajo.estado = "done"
+        except Exception as e:
+            trabajo.error = e
+            trabajo.estado = "failed"
+        trabajo.segundos = time.perf_counter() - inicio
+        with self.candado:
+            self.corriendo.remove(trabajo)
+        self.avisa(trabajo, "end")
+        self.lanza()
+
+    def cancela(self, tipos=None):
+        # cancela los trabajos de esos tipos (todos si es None)
+        with self.candado:
+            trabajos = self.corriendo + self.cola
+        for trabajo in trabajos:
+            if tipos is None or trabajo.tipo in tipos:
+                trabajo.cancela()
+        self.lanza()
+
+    def activos(self):
+        # tipos de los trabajos que corren y de los que esperan
+        with self.candado:
+            return [t.tipo for t in self.corriendo], [t.tipo for t in self.cola]
+
+    def ultimo(self, recurso):
+        # el ultimo trabajo sin terminar que usa ese recurso, o None
+        with self.candado:
+            trabajos = [t for t in self.corriendo + self.cola if recurso in t.recursos]
+        return trabajos[-1] if len(trabajos) > 0 else None
+
+    def espera(self):
+        while True:
+            with self.candado:
+                if len(self.corriendo) + len(self.cola) == 0:
+                    return
+            time.sleep(0.01)
+
+    def cierra(self):
+        # cancela todo, los que corren terminan solos
+        self.cancela()
+        self.pool.shutdown(wait=False)